@@ -0,0 +1,128 @@
+from decimal import Decimal
+from sqlalchemy import func, select, insert, update, delete, case
+from sqlalchemy.orm import Session
+from sql_models import Pedido, PagoPedido, PagoRecibido
+from client_balances import OPEN_STATES, lock_client, refresh_client_balances
+from ledger import BalanceDeltas, apply_balance_deltas
+from rollups import business_date
+
+def allocate_payments(db: Session, cliente_id: int, payments):
+    """Apply payments FIFO (oldest order first) to the client's open orders.
+
+    payments is a list of (pago_id, monto) applied in that order. One window
+    query returns only the open orders the payments reach (running debt
+    before the order below the amount paid); the links and the order updates
+    are then written with one batched statement each. The caller must hold
+    client_balances.lock_client() and commit.
+
+    Returns ({pago_id: amount applied}, order_dates): the amounts are
+    Decimals, anything not applied is credit left on the payment;
+    order_dates are the business dates (fecha_local) of the orders whose
+    estado or monto_pagado changed, for invalidate_reports().
+    """
+    remaining = [(pago_id, Decimal(str(monto or 0))) for pago_id, monto in payments]
+    applied = {pago_id: Decimal(0) for pago_id, _ in remaining}
+    amount = sum((monto for _, monto in remaining if monto > 0), Decimal(0))
+    if amount <= 0:
+        return applied, set()
+
+    orders = db.execute(fifo_orders_select(cliente_id, amount)).all()
+
+    links = []
+    order_updates = []
+    order_dates = set()
+    queue = [[pago_id, monto] for pago_id, monto in remaining if monto > 0]
+    for order in orders:
+        debt = Decimal(str(order.saldo))
+        paid = Decimal(str(order.monto_pagado))
+        while debt > 0 and queue:
+            pago_id, available = queue[0]
+            amount_to_apply = min(debt, available)
+            links.append({"pago_id": pago_id, "pedido_id": order.id, "monto": amount_to_apply})
+            applied[pago_id] += amount_to_apply
+            debt -= amount_to_apply
+            paid += amount_to_apply
+            queue[0][1] -= amount_to_apply
+            if queue[0][1] <= 0:
+                queue.pop(0)
+        order_updates.append({
+            "id": order.id,
+            "monto_pagado": paid,
+            "estado": 'pagado' if paid >= Decimal(str(order.total)) else 'parcial'
+        })
+        order_dates.add(business_date(order.fecha))
+        if not queue:
+            break
+
+    if links:
+        db.execute(insert(PagoPedido), links)
+        db.execute(update(Pedido), order_updates)
+    return applied, order_dates
+
+def fifo_orders_select(cliente_id: int, amount):
+    """Open orders of the client, oldest first, that a payment of amount reaches:
+    those whose running debt before them (deuda_previa) is below amount"""
+    saldo = Pedido.total - func.coalesce(Pedido.monto_pagado, 0)
+    open_orders = select(
+        Pedido.id,
+        Pedido.fecha,
+        Pedido.total,
+        func.coalesce(Pedido.monto_pagado, 0).label("monto_pagado"),
+        saldo.label("saldo"),
+        (func.sum(saldo).over(order_by=(Pedido.fecha, Pedido.id)) - saldo).label("deuda_previa")
+    ).where(
+        Pedido.cliente_id == cliente_id,
+        Pedido.estado.in_(OPEN_STATES),
+        saldo > 0
+    ).subquery()
+    return select(open_orders).where(open_orders.c.deuda_previa < amount).order_by(open_orders.c.deuda_previa)
+
+def reverse_payments(db: Session, pago_ids):
+    """Delete payments and undo their allocation to orders, set-based.
+
+    Takes the client locks in id order, then runs one UPDATE ... FROM the
+    links aggregated per order (monto_pagado and estado recomputed in SQL,
+    cancelled orders keep their estado), one DELETE of the links and one of
+    the payments. Method balances and saldo_cliente are updated in the same
+    transaction; the caller commits.
+
+    Returns (ids of the payments deleted, business dates of the orders
+    reverted) for invalidate_reports().
+    """
+    payments = db.query(
+        PagoRecibido.id, PagoRecibido.cliente_id, PagoRecibido.metodo_pago_id, PagoRecibido.fecha, PagoRecibido.monto
+    ).filter(PagoRecibido.id.in_(list(pago_ids))).all()
+    if not payments:
+        return [], set()
+
+    ids = [payment.id for payment in payments]
+    client_ids = sorted({payment.cliente_id for payment in payments if payment.cliente_id is not None})
+    for cliente_id in client_ids:
+        lock_client(db, cliente_id)
+
+    reverted = select(
+        PagoPedido.pedido_id, func.sum(PagoPedido.monto).label("monto")
+    ).where(PagoPedido.pago_id.in_(ids)).group_by(PagoPedido.pedido_id).subquery()
+    remaining = func.coalesce(Pedido.monto_pagado, 0) - reverted.c.monto
+    reverted_orders = db.execute(
+        update(Pedido).where(Pedido.id == reverted.c.pedido_id).values(
+            monto_pagado=case((remaining <= 0, 0), else_=remaining),
+            estado=case(
+                (Pedido.estado == 'cancelado', Pedido.estado),
+                (remaining <= 0, 'pendiente'),
+                (remaining < Pedido.total, 'parcial'),
+                else_=Pedido.estado
+            )
+        ).returning(Pedido.fecha).execution_options(synchronize_session=False)
+    ).all()
+    order_dates = {business_date(fecha) for (fecha,) in reverted_orders}
+    db.execute(delete(PagoPedido).where(PagoPedido.pago_id.in_(ids)))
+
+    balances = BalanceDeltas()
+    for payment in payments:
+        balances.add_payment(payment.metodo_pago_id, payment.fecha, payment.monto, sign=-1)
+    apply_balance_deltas(db, balances)
+
+    db.execute(delete(PagoRecibido).where(PagoRecibido.id.in_(ids)).execution_options(synchronize_session=False))
+    refresh_client_balances(db, client_ids)
+    return ids, order_dates
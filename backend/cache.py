@@ -0,0 +1,65 @@
+import threading
+import time
+
+class SnapshotCache:
+    """Thread-safe in-process cache of computed report payloads.
+
+    Entries never expire on their own: keys carry the business date, and the
+    routers that write orders, payments, expenses or transfers call
+    invalidate_reports() after committing.
+
+    Every invalidation bumps a generation counter. Readers take
+    generation() before computing and pass it to set(), which drops the
+    payload if a write invalidated the cache meanwhile: the payload may
+    predate that write and would otherwise be served until the next one.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = {} # key -> (stored_at, payload)
+        self._generation = 0
+
+    def get(self, key):
+        """Returns (payload, age_seconds) or None when the key is not cached"""
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is None:
+            return None
+        stored_at, payload = entry
+        return payload, time.monotonic() - stored_at
+
+    def generation(self):
+        """Current invalidation counter; read it before computing a payload"""
+        with self._lock:
+            return self._generation
+
+    def set(self, key, payload, generation=None):
+        """Store payload unless the cache was invalidated after generation was read"""
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                return
+            self._entries[key] = (time.monotonic(), payload)
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+
+    def discard_where(self, predicate):
+        """Drop the entries whose key matches predicate(key)"""
+        with self._lock:
+            self._generation += 1
+            for key in [k for k in self._entries if predicate(k)]:
+                del self._entries[key]
+
+dashboard_cache = SnapshotCache()
+# Pending order lines of past business dates for the WhatsApp summaries, keyed by fecha
+summary_cache = SnapshotCache()
+
+def invalidate_reports(order_dates=None):
+    """Drop cached report snapshots after a write that changes their inputs.
+    order_dates are the business dates of orders created, edited or deleted,
+    or whose estado changed through payment allocation or reversal."""
+    dashboard_cache.clear()
+    if order_dates:
+        summary_cache.discard_where(lambda key: key in order_dates)
@@ -0,0 +1,171 @@
+from datetime import timedelta
+from decimal import Decimal
+from sqlalchemy import func, case, and_, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+from sql_models import Pedido, Cliente, SaldoCliente
+
+OPEN_STATES = ['pendiente', 'parcial']
+
+# First key of the two-key advisory locks taken per client (pg_advisory_xact_lock(ns, cliente_id))
+CLIENT_LOCK_NAMESPACE = 1001
+
+# (key, min age in days, max age in days or None for open-ended)
+AGING_BUCKETS = [
+    ("0_7", 0, 7),
+    ("8_15", 8, 15),
+    ("16_30", 16, 30),
+    ("31_60", 31, 60),
+    ("mas_60", 61, None),
+]
+
+def get_aging_by_client(db: Session, today):
+    """Outstanding debt per client split into age buckets, in one GROUP BY
+    (see aging_query)"""
+    return [
+        {
+            "cliente_id": row.cliente_id,
+            "nombre": row.nombre or "Desconocido",
+            "total_deuda": float(row.total_deuda),
+            "ordenes_pendientes": row.ordenes_pendientes,
+            "fecha_mas_antigua": row.fecha_mas_antigua,
+            "antiguedad": {key: float(getattr(row, key) or 0) for key, _, _ in AGING_BUCKETS}
+        }
+        for row in aging_query(db, today)
+    ]
+
+def aging_query(db: Session, today):
+    """Open debt per client with one column per AGING_BUCKETS key, largest debt first.
+
+    Age is counted in business days from the order's fecha_local to today;
+    bucket bounds are turned into date cutoffs so the filter stays sargable.
+    Orders dated after today have age 0 and fall in the first bucket, so the
+    buckets always add up to total_deuda.
+    """
+    saldo = Pedido.total - func.coalesce(Pedido.monto_pagado, 0)
+    fecha = func.coalesce(Pedido.fecha_local, today)
+
+    bucket_columns = []
+    for key, min_age, max_age in AGING_BUCKETS:
+        conditions = []
+        if min_age > 0:
+            conditions.append(fecha <= today - timedelta(days=min_age))
+        if max_age is not None:
+            conditions.append(fecha >= today - timedelta(days=max_age))
+        bucket_columns.append(func.sum(case((and_(*conditions), saldo), else_=0)).label(key))
+
+    return db.query(
+        Pedido.cliente_id,
+        Cliente.nombre,
+        func.sum(saldo).label('total_deuda'),
+        func.count(Pedido.id).label('ordenes_pendientes'),
+        func.min(func.coalesce(Pedido.fecha, Pedido.created_at)).label('fecha_mas_antigua'),
+        *bucket_columns
+    ).outerjoin(
+        Cliente, Cliente.id == Pedido.cliente_id
+    ).filter(
+        Pedido.estado.in_(OPEN_STATES),
+        saldo > 0
+    ).group_by(
+        Pedido.cliente_id, Cliente.nombre
+    ).order_by(func.sum(saldo).desc())
+
+def lock_client(db: Session, cliente_id: int):
+    """Serialize writes to a client's debt until the current transaction ends.
+
+    Payment allocation and saldo_cliente refreshes take this lock first so
+    concurrent cashiers cannot lose each other's updates.
+    """
+    db.execute(select(func.pg_advisory_xact_lock(CLIENT_LOCK_NAMESPACE, cliente_id)))
+
+def refresh_client_balances(db: Session, client_ids):
+    """Recompute the saldo_cliente rows of the given clients within the caller's transaction.
+
+    The client locks are taken in id order before pending ORM changes are
+    flushed; writers should already hold them (taken before their first
+    write), in which case this is a no-op. Only each client's open orders
+    are read (partial index idx_pedidos_abiertos_cliente_fecha), so
+    concurrent writers cannot overwrite each other's result.
+    """
+    client_ids = sorted({cid for cid in client_ids if cid is not None})
+    if not client_ids:
+        return
+
+    for cliente_id in client_ids:
+        lock_client(db, cliente_id)
+    db.flush()
+
+    saldo = Pedido.total - func.coalesce(Pedido.monto_pagado, 0)
+    summary = select(
+        Cliente.id,
+        func.coalesce(func.sum(saldo), 0),
+        func.count(Pedido.id),
+        func.min(func.coalesce(Pedido.fecha, Pedido.created_at))
+    ).select_from(Cliente).outerjoin(
+        Pedido, and_(
+            Pedido.cliente_id == Cliente.id,
+            Pedido.estado.in_(OPEN_STATES),
+            saldo > 0
+        )
+    ).where(Cliente.id.in_(client_ids)).group_by(Cliente.id)
+
+    stmt = insert(SaldoCliente).from_select(
+        ["cliente_id", "deuda", "pedidos_abiertos", "fecha_mas_antigua"], summary
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[SaldoCliente.cliente_id],
+        set_={
+            "deuda": stmt.excluded.deuda,
+            "pedidos_abiertos": stmt.excluded.pedidos_abiertos,
+            "fecha_mas_antigua": stmt.excluded.fecha_mas_antigua,
+            "updated_at": func.now()
+        }
+    )
+    db.execute(stmt)
+
+def get_client_balances(db: Session):
+    """Clients with outstanding debt from saldo_cliente, largest debt first"""
+    return [
+        {
+            "cliente_id": saldo.cliente_id,
+            "nombre": nombre or "Desconocido",
+            "total_deuda": float(saldo.deuda),
+            "ordenes_pendientes": saldo.pedidos_abiertos,
+            "fecha_mas_antigua": saldo.fecha_mas_antigua
+        }
+        for saldo, nombre in client_balances_query(db)
+    ]
+
+def client_balances_query(db: Session):
+    """(saldo_cliente row, client name) of clients with outstanding debt, largest debt first"""
+    return db.query(SaldoCliente, Cliente.nombre).join(
+        Cliente, Cliente.id == SaldoCliente.cliente_id
+    ).filter(
+        SaldoCliente.deuda > 0
+    ).order_by(SaldoCliente.deuda.desc())
+
+def get_client_credit(db: Session, client_ids):
+    """{cliente_id: (cupo_credito, deuda)} for the given clients that have a credit limit.
+
+    One read by primary key on clientes and saldo_cliente; clients with
+    cupo_credito = 0 have no limit and are left out.
+    """
+    rows = db.query(
+        Cliente.id, Cliente.cupo_credito, func.coalesce(SaldoCliente.deuda, 0)
+    ).outerjoin(
+        SaldoCliente, SaldoCliente.cliente_id == Cliente.id
+    ).filter(
+        Cliente.id.in_(list(client_ids)),
+        Cliente.cupo_credito > 0
+    ).all()
+    return {cid: (Decimal(str(cupo)), Decimal(str(deuda))) for cid, cupo, deuda in rows}
+
+def credit_limit_error(cliente_id: int, credit, amount):
+    """Error message when adding amount to the client's debt goes over its cupo_credito, else None"""
+    if credit is None:
+        return None
+    cupo, deuda = credit
+    amount = Decimal(str(amount))
+    if amount <= 0 or deuda + amount <= cupo:
+        return None
+    return f"Credit limit exceeded for client {cliente_id}: debt {deuda} + order {amount} > limit {cupo}"
@@ -0,0 +1,242 @@
+from collections import defaultdict
+from datetime import timedelta
+from decimal import Decimal
+from sqlalchemy import func, select, literal, union_all, Integer, Numeric
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+from sql_models import MedioPago, SaldoMedioPago, CierreMedioPago, PagoRecibido, Gasto, Transferencia
+from rollups import business_date
+from utils import local_date_range
+
+# Business time zone used to date payments (matches pedidos.fecha_local)
+COLOMBIA_TZ_NAME = 'America/Bogota'
+
+class BalanceDeltas:
+    """Accumulates changes to saldos_medio_pago, keyed by payment method and business date.
+
+    Writers record a movement's effect before and after the change
+    (sign=-1 / sign=+1) and apply everything with one upsert. The date is
+    kept so backdated movements can also correct the daily checkpoints.
+    """
+
+    def __init__(self):
+        self._rows = defaultdict(lambda: {"ingresos": Decimal(0), "egresos": Decimal(0)})
+
+    def add_payment(self, medio_pago_id, fecha, monto, sign: int = 1):
+        if medio_pago_id is not None:
+            self._rows[(medio_pago_id, business_date(fecha))]["ingresos"] += sign * Decimal(str(monto or 0))
+
+    def add_expense(self, medio_pago_id, fecha, valor, sign: int = 1):
+        if medio_pago_id is not None:
+            self._rows[(medio_pago_id, business_date(fecha))]["egresos"] += sign * Decimal(str(valor or 0))
+
+    def add_transfer(self, origen_id, destino_id, fecha, valor, sign: int = 1):
+        self.add_expense(origen_id, fecha, valor, sign)
+        self.add_payment(destino_id, fecha, valor, sign)
+
+    def dated_rows(self):
+        return [
+            {"medio_pago_id": medio_pago_id, "fecha": fecha, **values}
+            for (medio_pago_id, fecha), values in self._rows.items()
+            if any(values.values())
+        ]
+
+    def rows(self):
+        totals = defaultdict(lambda: {"ingresos": Decimal(0), "egresos": Decimal(0)})
+        for (medio_pago_id, _), values in self._rows.items():
+            totals[medio_pago_id]["ingresos"] += values["ingresos"]
+            totals[medio_pago_id]["egresos"] += values["egresos"]
+        return [
+            {"medio_pago_id": medio_pago_id, **values}
+            for medio_pago_id, values in totals.items()
+            if any(values.values())
+        ]
+
+def apply_balance_deltas(db: Session, deltas: BalanceDeltas):
+    """Add the accumulated deltas to saldos_medio_pago within the caller's transaction.
+
+    Movements dated on or before an existing checkpoint also shift every
+    checkpoint from that date on, so as-of balances stay correct.
+    """
+    rows = deltas.rows()
+    if not rows:
+        return
+
+    stmt = insert(SaldoMedioPago)
+    table = SaldoMedioPago.__table__
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[table.c.medio_pago_id],
+        set_={
+            "ingresos": table.c.ingresos + stmt.excluded.ingresos,
+            "egresos": table.c.egresos + stmt.excluded.egresos,
+            "updated_at": func.now()
+        }
+    )
+    db.execute(stmt, rows)
+
+    cierres = CierreMedioPago.__table__
+    for row in deltas.dated_rows():
+        affected = select(
+            cierres.c.fecha,
+            literal(row["medio_pago_id"], Integer),
+            literal(row["ingresos"], Numeric(14, 2)),
+            literal(row["egresos"], Numeric(14, 2))
+        ).where(cierres.c.fecha >= row["fecha"]).group_by(cierres.c.fecha)
+        adjust = insert(CierreMedioPago).from_select(
+            ["fecha", "medio_pago_id", "ingresos", "egresos"], affected
+        )
+        adjust = adjust.on_conflict_do_update(
+            index_elements=[cierres.c.fecha, cierres.c.medio_pago_id],
+            set_={
+                "ingresos": cierres.c.ingresos + adjust.excluded.ingresos,
+                "egresos": cierres.c.egresos + adjust.excluded.egresos
+            }
+        )
+        db.execute(adjust)
+
+def movements_query(start=None, end=None, medio_pago_id=None):
+    """UNION ALL of every movement per payment method between the business dates start..end.
+
+    Rows are (tipo, id, medio_pago_id, dia, descripcion, ingreso, egreso);
+    each source is filtered on its own indexed fecha column.
+    """
+    pago_dia = func.date(func.timezone(COLOMBIA_TZ_NAME, PagoRecibido.fecha))
+    pagos = select(
+        literal("pago").label("tipo"),
+        PagoRecibido.id,
+        PagoRecibido.metodo_pago_id.label("medio_pago_id"),
+        pago_dia.label("dia"),
+        PagoRecibido.descripcion,
+        PagoRecibido.monto.label("ingreso"),
+        literal(0).label("egreso")
+    ).where(PagoRecibido.metodo_pago_id.isnot(None))
+    gastos = select(
+        literal("gasto"), Gasto.id, Gasto.medio_pago_id, Gasto.fecha, Gasto.concepto, literal(0), Gasto.valor
+    ).where(Gasto.medio_pago_id.isnot(None))
+    entradas = select(
+        literal("transferencia_entrada"), Transferencia.id, Transferencia.destino_id, Transferencia.fecha,
+        Transferencia.descripcion, Transferencia.valor, literal(0)
+    ).where(Transferencia.destino_id.isnot(None))
+    salidas = select(
+        literal("transferencia_salida"), Transferencia.id, Transferencia.origen_id, Transferencia.fecha,
+        Transferencia.descripcion, literal(0), Transferencia.valor
+    ).where(Transferencia.origen_id.isnot(None))
+
+    if start is not None:
+        pagos = pagos.where(PagoRecibido.fecha >= local_date_range(start)[0])
+        gastos = gastos.where(Gasto.fecha >= start)
+        entradas = entradas.where(Transferencia.fecha >= start)
+        salidas = salidas.where(Transferencia.fecha >= start)
+    if end is not None:
+        pagos = pagos.where(PagoRecibido.fecha < local_date_range(end)[1])
+        gastos = gastos.where(Gasto.fecha <= end)
+        entradas = entradas.where(Transferencia.fecha <= end)
+        salidas = salidas.where(Transferencia.fecha <= end)
+
+    if medio_pago_id is not None:
+        pagos = pagos.where(PagoRecibido.metodo_pago_id == medio_pago_id)
+        gastos = gastos.where(Gasto.medio_pago_id == medio_pago_id)
+        entradas = entradas.where(Transferencia.destino_id == medio_pago_id)
+        salidas = salidas.where(Transferencia.origen_id == medio_pago_id)
+
+    return union_all(pagos, gastos, entradas, salidas).subquery()
+
+def balances_as_of(db: Session, as_of, medio_pago_id=None):
+    """{medio_pago_id: (ingresos, egresos)} at the end of business date as_of.
+
+    Starts from the nearest checkpoint on or before as_of and adds only the
+    movements dated after it.
+    """
+    checkpoint = db.query(func.max(CierreMedioPago.fecha)).filter(CierreMedioPago.fecha <= as_of).scalar()
+
+    totals = defaultdict(lambda: [Decimal(0), Decimal(0)])
+    if checkpoint is not None:
+        query = db.query(
+            CierreMedioPago.medio_pago_id, CierreMedioPago.ingresos, CierreMedioPago.egresos
+        ).filter(CierreMedioPago.fecha == checkpoint)
+        if medio_pago_id is not None:
+            query = query.filter(CierreMedioPago.medio_pago_id == medio_pago_id)
+        for method_id, ingresos, egresos in query.all():
+            totals[method_id][0] += ingresos
+            totals[method_id][1] += egresos
+
+    if checkpoint is None or checkpoint < as_of:
+        start = checkpoint + timedelta(days=1) if checkpoint is not None else None
+        movements = movements_query(start, as_of, medio_pago_id)
+        rows = db.query(
+            movements.c.medio_pago_id,
+            func.sum(movements.c.ingreso),
+            func.sum(movements.c.egreso)
+        ).group_by(movements.c.medio_pago_id).all()
+        for method_id, ingresos, egresos in rows:
+            totals[method_id][0] += Decimal(str(ingresos or 0))
+            totals[method_id][1] += Decimal(str(egresos or 0))
+
+    return totals
+
+def get_balances(db: Session, as_of=None):
+    """Balance of every active payment method, current or at the end of business date as_of"""
+    methods = db.query(MedioPago.id, MedioPago.nombre, MedioPago.tipo)
+    if as_of is None:
+        rows = methods.add_columns(
+            func.coalesce(SaldoMedioPago.ingresos, 0),
+            func.coalesce(SaldoMedioPago.egresos, 0)
+        ).outerjoin(
+            SaldoMedioPago, SaldoMedioPago.medio_pago_id == MedioPago.id
+        ).filter(
+            MedioPago.activo == True
+        ).order_by(MedioPago.id).all()
+    else:
+        totals = balances_as_of(db, as_of)
+        rows = [
+            (method_id, nombre, tipo, *totals.get(method_id, (0, 0)))
+            for method_id, nombre, tipo in methods.filter(MedioPago.activo == True).order_by(MedioPago.id).all()
+        ]
+
+    return [
+        {
+            "id": row[0],
+            "nombre": row[1],
+            "tipo": row[2],
+            "ingresos": float(row[3]),
+            "egresos": float(row[4]),
+            "saldo": float(row[3] - row[4])
+        }
+        for row in rows
+    ]
+
+MOVEMENT_ORDER = {"pago": 0, "transferencia_entrada": 1, "transferencia_salida": 2, "gasto": 3}
+
+def get_movements(db: Session, medio_pago_id: int, start, end):
+    """Movements of one payment method between business dates start..end with a running balance"""
+    opening = balances_as_of(db, start - timedelta(days=1), medio_pago_id).get(medio_pago_id, (0, 0))
+    saldo = Decimal(str(opening[0])) - Decimal(str(opening[1]))
+    saldo_inicial = saldo
+
+    movements = movements_query(start, end, medio_pago_id)
+    rows = db.query(movements).all()
+    rows = sorted(rows, key=lambda r: (r.dia, MOVEMENT_ORDER[r.tipo], r.id))
+
+    result = []
+    for row in rows:
+        ingreso = Decimal(str(row.ingreso or 0))
+        egreso = Decimal(str(row.egreso or 0))
+        saldo += ingreso - egreso
+        result.append({
+            "tipo": row.tipo,
+            "id": row.id,
+            "fecha": row.dia,
+            "descripcion": row.descripcion,
+            "ingreso": float(ingreso),
+            "egreso": float(egreso),
+            "saldo": float(saldo)
+        })
+
+    return {
+        "medio_pago_id": medio_pago_id,
+        "start_date": start,
+        "end_date": end,
+        "saldo_inicial": float(saldo_inicial),
+        "saldo_final": float(saldo),
+        "movimientos": result
+    }
@@ -107,10 +107,12 @@ class OrderCreate(BaseModel):
     valor_domicilio: Optional[float] = 0
     estado: Optional[str] = "pendiente"
     observaciones: Optional[str] = None
+    ignorar_cupo: bool = False # Create/update even if it exceeds the client's cupo_credito
 
 class OrderStatusUpdate(BaseModel):
     estado: str
     medio_pago_id: Optional[int] = None
+    ignorar_cupo: bool = False # Reopen even if it exceeds the client's cupo_credito
 
 class OrderItemResponse(BaseModel):
     id: int
@@ -131,10 +133,24 @@ class OrderResponse(BaseModel):
     medio_pago_id: Optional[int]
     estado: str
     items: List[OrderItemResponse] = []
+    excede_cupo: bool = False # Saved over the client's credit limit (ignorar_cupo)
 
     class Config:
         from_attributes = True
 
+class BulkOrderResult(BaseModel):
+    index: int # Position of the order in the request
+    ok: bool
+    id: Optional[int] = None
+    total: Optional[float] = None
+    error: Optional[str] = None
+    excede_cupo: bool = False
+
+class BulkOrderResponse(BaseModel):
+    created: int
+    failed: int
+    results: List[BulkOrderResult]
+
 # --- Expense Models ---
 # ... (keep existing)
 
@@ -163,6 +179,9 @@ class PaymentReceived(PaymentReceivedBase):
     class Config:
         from_attributes = True
 
+class PaymentBulkDelete(BaseModel):
+    ids: List[int]
+
 class ExpenseBase(BaseModel):
     concepto: str
     categoria: str
@@ -183,10 +202,51 @@ class Expense(ExpenseBase):
     created_at: datetime
     updated_at: Optional[datetime] = None
     proveedor_nombre: Optional[str] = None
+    gasto_recurrente_id: Optional[int] = None
+    periodo: Optional[date] = None
 
     class Config:
         from_attributes = True
 
+class ExpenseCategoryTotal(BaseModel):
+    categoria: Optional[str] = None
+    total: float
+    cantidad: int
+
+class ExpensePage(BaseModel):
+    gastos: List[Expense]
+    totales_por_categoria: List[ExpenseCategoryTotal]
+
+class ExpenseBulkResponse(BaseModel):
+    created: int
+    skipped: int = 0 # Already generated for the period
+    ids: List[int]
+
+class RecurringExpenseBase(BaseModel):
+    concepto: str
+    categoria: str
+    tipo_gasto: str = "fijo" # fijo, variable
+    valor: float
+    dia_mes: int = 1 # 1-31, clamped to the last day of shorter months
+    proveedor_id: Optional[int] = None
+    medio_pago_id: Optional[int] = None
+    observaciones: Optional[str] = None
+    activo: bool = True
+
+class RecurringExpenseCreate(RecurringExpenseBase):
+    pass
+
+class RecurringExpense(RecurringExpenseBase):
+    id: int
+    created_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
+class RecurringExpenseGenerate(BaseModel):
+    periodo: Optional[str] = None # YYYY-MM, defaults to the current month
+    ids: Optional[List[int]] = None # Templates to generate, defaults to all active
+
 # --- Payment Method Models ---
 
 class PaymentMethodBase(BaseModel):
@@ -0,0 +1,227 @@
+import csv
+import re
+from collections import defaultdict
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+from sql_models import Cliente, PagoRecibido
+from allocation import allocate_payments
+from client_balances import lock_client, refresh_client_balances
+from ledger import BalanceDeltas, apply_balance_deltas
+from utils import COLOMBIA_TZ, to_colombia_time
+
+# Rows written and allocated per transaction; bounds memory and lock time
+IMPORT_CHUNK_SIZE = 500
+
+DATE_FORMATS = ("%Y-%m-%d %H:%M:%S", "%Y-%m-%d %H:%M", "%Y-%m-%d", "%d/%m/%Y %H:%M:%S", "%d/%m/%Y %H:%M", "%d/%m/%Y")
+
+def normalize_phone(value):
+    """Last 10 digits of a phone number (Colombian mobile without country code), or None"""
+    digits = re.sub(r"\D", "", value or "")
+    return digits[-10:] if len(digits) >= 7 else None
+
+def parse_amount(value) -> Decimal:
+    """Parses statement amounts such as 50000, 50.000, 50,000.50, 1.234,56 or $ 20.000"""
+    text = re.sub(r"[^\d,.\-]", "", value or "")
+    if "," in text and "." in text:
+        decimal_sep = "," if text.rfind(",") > text.rfind(".") else "."
+        thousands_sep = "." if decimal_sep == "," else ","
+        text = text.replace(thousands_sep, "").replace(decimal_sep, ".")
+    else:
+        for sep in (",", "."):
+            if sep in text:
+                # A single separator followed by exactly 3 digits groups thousands
+                if len(text.rsplit(sep, 1)[1]) == 3:
+                    text = text.replace(sep, "")
+                else:
+                    text = text.replace(sep, ".")
+    try:
+        return Decimal(text)
+    except InvalidOperation:
+        raise ValueError(f"Invalid amount: {value}")
+
+def parse_statement_date(value) -> datetime:
+    value = (value or "").strip()
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(value, fmt).replace(tzinfo=COLOMBIA_TZ)
+        except ValueError:
+            continue
+    raise ValueError(f"Invalid date: {value}")
+
+class ClientMatcher:
+    """Matches statement rows to clients by phone (telefono column or digits in
+    the reference) or by the client name in the reference.
+
+    Loads one (id, nombre, telefono) row per client up front; phones or names
+    shared by several clients are ambiguous and never matched.
+    """
+
+    def __init__(self, db: Session):
+        self.by_phone = {}
+        self.by_name = {}
+        for cid, nombre, telefono in db.query(Cliente.id, Cliente.nombre, Cliente.telefono):
+            self._add(self.by_phone, normalize_phone(telefono), cid)
+            self._add(self.by_name, (nombre or "").strip().lower() or None, cid)
+
+    @staticmethod
+    def _add(index, key, cid):
+        if key is None:
+            return
+        index[key] = None if key in index and index[key] != cid else cid
+
+    def match(self, telefono, referencia):
+        """Returns the matching client id or None"""
+        for phone in (normalize_phone(telefono), normalize_phone(referencia)):
+            if phone and self.by_phone.get(phone):
+                return self.by_phone[phone]
+        name = (referencia or "").strip().lower()
+        return self.by_name.get(name) if name else None
+
+def import_statement(db: Session, stream, metodo_pago_id: int, chunk_size: int = IMPORT_CHUNK_SIZE):
+    """Import a CSV bank statement as payments received through metodo_pago_id.
+
+    The CSV needs fecha and monto columns; referencia, telefono and
+    descripcion are optional. The file is read in one pass and processed in
+    chunks: each chunk's payments are inserted with one batched INSERT and
+    allocated FIFO per client with allocate_payments(), the same logic as
+    register_payment, then committed. Rows already imported (same client,
+    date, amount and description) are skipped.
+
+    Returns (report, order_dates): totals with one report row per statement
+    line, and the business dates of the orders the payments were applied to
+    (for invalidate_reports()).
+    """
+    reader = csv.DictReader(stream)
+    if reader.fieldnames is None:
+        raise ValueError("Empty statement")
+    reader.fieldnames = [(name or "").strip().lower() for name in reader.fieldnames]
+    missing = [column for column in ("fecha", "monto") if column not in reader.fieldnames]
+    if missing:
+        raise ValueError(f"Missing columns: {', '.join(missing)}")
+
+    matcher = ClientMatcher(db)
+    report = []
+    chunk = []
+    order_dates = set()
+
+    for line_number, row in enumerate(reader, start=2):
+        entry = {"fila": line_number, "estado": None, "cliente_id": None, "pago_id": None,
+                 "monto": None, "aplicado": None, "error": None}
+        report.append(entry)
+        try:
+            monto = parse_amount(row.get("monto"))
+            fecha = parse_statement_date(row.get("fecha"))
+        except ValueError as e:
+            entry.update(estado="invalido", error=str(e))
+            continue
+
+        entry["monto"] = float(monto)
+        if monto <= 0:
+            # Withdrawals and fees are not customer payments
+            entry["estado"] = "ignorado"
+            continue
+
+        referencia = (row.get("referencia") or "").strip()
+        cliente_id = matcher.match(row.get("telefono"), referencia)
+        if cliente_id is None:
+            entry.update(estado="sin_cliente", error="No client matches the phone or reference")
+            continue
+
+        descripcion = (row.get("descripcion") or "").strip()
+        if referencia:
+            descripcion = f"{descripcion} (ref {referencia})".strip()
+
+        entry["cliente_id"] = cliente_id
+        chunk.append((entry, {
+            "cliente_id": cliente_id,
+            "monto": monto,
+            "fecha": fecha,
+            "descripcion": descripcion or None,
+            "metodo_pago_id": metodo_pago_id
+        }))
+        if len(chunk) >= chunk_size:
+            order_dates |= import_chunk(db, chunk)
+            chunk = []
+
+    if chunk:
+        order_dates |= import_chunk(db, chunk)
+
+    totals = defaultdict(int)
+    for entry in report:
+        totals[entry["estado"]] += 1
+    return {
+        "filas": len(report),
+        "importados": totals["importado"],
+        "duplicados": totals["duplicado"],
+        "sin_cliente": totals["sin_cliente"],
+        "invalidos": totals["invalido"],
+        "ignorados": totals["ignorado"],
+        "errores": totals["error"],
+        "total_importado": sum(e["monto"] for e in report if e["estado"] == "importado"),
+        "total_aplicado": sum(e["aplicado"] for e in report if e["estado"] == "importado"),
+        "detalle": report
+    }, order_dates
+
+def import_chunk(db: Session, chunk):
+    """Insert, allocate and commit one chunk of matched rows [(report entry, payment row)].
+    Returns the business dates of the orders allocated to."""
+    order_dates = set()
+    try:
+        client_ids = sorted({payment["cliente_id"] for _, payment in chunk})
+        for cliente_id in client_ids:
+            lock_client(db, cliente_id)
+
+        # Skip payments already imported from an earlier run of the same statement
+        fechas = [payment["fecha"] for _, payment in chunk]
+        existing = {
+            (cid, to_colombia_time(fecha), monto, descripcion)
+            for cid, fecha, monto, descripcion in db.query(
+                PagoRecibido.cliente_id, PagoRecibido.fecha, PagoRecibido.monto, PagoRecibido.descripcion
+            ).filter(
+                PagoRecibido.cliente_id.in_(client_ids),
+                PagoRecibido.fecha.between(min(fechas), max(fechas))
+            )
+        }
+        new = []
+        for entry, payment in chunk:
+            key = (payment["cliente_id"], to_colombia_time(payment["fecha"]), payment["monto"], payment["descripcion"])
+            if key in existing:
+                entry["estado"] = "duplicado"
+            else:
+                new.append((entry, payment))
+        if not new:
+            db.rollback()
+            return order_dates
+
+        pago_ids = db.scalars(
+            insert(PagoRecibido).returning(PagoRecibido.id, sort_by_parameter_order=True),
+            [payment for _, payment in new]
+        ).all()
+
+        balances = BalanceDeltas()
+        by_client = defaultdict(list)
+        for pago_id, (entry, payment) in zip(pago_ids, new):
+            entry["pago_id"] = pago_id
+            balances.add_payment(payment["metodo_pago_id"], payment["fecha"], payment["monto"])
+            by_client[payment["cliente_id"]].append((payment["fecha"], pago_id, payment["monto"], entry))
+        apply_balance_deltas(db, balances)
+
+        # Oldest deposit first, as if they had been registered one by one
+        for cliente_id in sorted(by_client):
+            payments = sorted(by_client[cliente_id], key=lambda p: (p[0], p[1]))
+            applied, dates = allocate_payments(db, cliente_id, [(pago_id, monto) for _, pago_id, monto, _ in payments])
+            order_dates |= dates
+            for _, pago_id, _, entry in payments:
+                entry.update(estado="importado", aplicado=float(applied[pago_id]))
+        refresh_client_balances(db, by_client)
+
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        for entry, _ in chunk:
+            if entry["estado"] != "duplicado":
+                entry.update(estado="error", pago_id=None, aplicado=None, error=str(e))
+        return set()
+    return order_dates
@@ -0,0 +1,99 @@
+import threading
+import time
+from typing import Optional
+from sqlalchemy.orm import Session
+from sql_models import Producto, PrecioCliente
+
+class PriceBook:
+    """In-process cache of standard prices and active per-client special prices.
+
+    The whole book is loaded with two queries the first time it is needed and
+    served from memory afterwards. Writes through the products API call
+    invalidate(); rules edited directly in the database (or from another worker)
+    are picked up when the book expires after ttl_seconds.
+    """
+
+    def __init__(self, ttl_seconds: int = 300):
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._products = None # producto_id -> (nombre, precio_estandar)
+        self._special_prices = {} # (cliente_id, producto_id) -> precio_especial
+        self._unknown = set() # producto_ids looked up and not found since the last load
+        self._loaded_at = 0.0
+        self.hits = 0
+        self.misses = 0
+
+    def invalidate(self):
+        """Drop the cached book so the next lookup reloads it"""
+        with self._lock:
+            self._products = None
+
+    def _load(self, db: Session):
+        products = {
+            p.id: (p.nombre, float(p.precio_estandar or 0))
+            for p in db.query(Producto.id, Producto.nombre, Producto.precio_estandar)
+        }
+        special_prices = {
+            (r.cliente_id, r.producto_id): float(r.precio_especial)
+            for r in db.query(PrecioCliente.cliente_id, PrecioCliente.producto_id, PrecioCliente.precio_especial).filter(
+                PrecioCliente.activo == True
+            )
+        }
+        self._products = products
+        self._special_prices = special_prices
+        self._unknown = set()
+        self._loaded_at = time.monotonic()
+
+    def _load_product(self, db: Session, producto_id: int):
+        """Add one product (and its special prices) to the loaded book, or
+        remember that it does not exist until the next load"""
+        product = db.query(Producto.nombre, Producto.precio_estandar).filter(Producto.id == producto_id).first()
+        if product is None:
+            self._unknown.add(producto_id)
+            return
+        self._products[producto_id] = (product.nombre, float(product.precio_estandar or 0))
+        for r in db.query(PrecioCliente.cliente_id, PrecioCliente.precio_especial).filter(
+            PrecioCliente.producto_id == producto_id,
+            PrecioCliente.activo == True
+        ):
+            self._special_prices[(r.cliente_id, producto_id)] = float(r.precio_especial)
+
+    def _lookup(self, db: Session, producto_id: int):
+        with self._lock:
+            expired = time.monotonic() - self._loaded_at > self.ttl_seconds
+            if self._products is None or expired:
+                self.misses += 1
+                self._load(db)
+            elif producto_id not in self._products and producto_id not in self._unknown:
+                # Possibly created by another worker since the last load; unknown
+                # ids are cached as misses so bad ids cannot force reloads
+                self.misses += 1
+                self._load_product(db, producto_id)
+            else:
+                self.hits += 1
+            return self._products.get(producto_id), self._special_prices
+
+    def price_for(self, db: Session, cliente_id: int, producto_id: int) -> Optional[float]:
+        """Price that applies to a client for a product, or None if the product does not exist"""
+        product, special_prices = self._lookup(db, producto_id)
+        if product is None:
+            return None
+        special = special_prices.get((cliente_id, producto_id))
+        return special if special is not None else product[1]
+
+    def product_name(self, db: Session, producto_id: int) -> Optional[str]:
+        product, _ = self._lookup(db, producto_id)
+        return product[0] if product else None
+
+    def stats(self):
+        with self._lock:
+            loaded = self._products is not None
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "products": len(self._products) if loaded else 0,
+                "special_prices": len(self._special_prices) if loaded else 0,
+                "age_seconds": round(time.monotonic() - self._loaded_at, 1) if loaded else None
+            }
+
+price_book = PriceBook()
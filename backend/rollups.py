@@ -0,0 +1,71 @@
+from collections import defaultdict
+from decimal import Decimal
+from sqlalchemy import func
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+from sql_models import ResumenDiario
+from utils import to_colombia_time
+
+ROLLUP_FIELDS = ("ventas", "domicilios", "pedidos", "cancelado", "gastos")
+
+class DailyDeltas:
+    """Accumulates changes to resumen_diario rows, keyed by business date.
+
+    Writers record what an order or expense contributed before and after the
+    change (sign=-1 / sign=+1) and apply everything with one upsert.
+    """
+
+    def __init__(self):
+        self._rows = defaultdict(lambda: {
+            "ventas": Decimal(0),
+            "domicilios": Decimal(0),
+            "pedidos": 0,
+            "cancelado": Decimal(0),
+            "gastos": Decimal(0)
+        })
+
+    def add_order(self, fecha, estado, total, valor_domicilio, sign: int = 1):
+        row = self._rows[business_date(fecha)]
+        if estado == 'cancelado':
+            row["cancelado"] += sign * Decimal(str(total or 0))
+        else:
+            row["ventas"] += sign * Decimal(str(total or 0))
+            row["domicilios"] += sign * Decimal(str(valor_domicilio or 0))
+            row["pedidos"] += sign
+
+    def add_expense(self, fecha, valor, sign: int = 1):
+        self._rows[business_date(fecha)]["gastos"] += sign * Decimal(str(valor or 0))
+
+    def dates(self):
+        """Business dates touched by the recorded changes"""
+        return set(self._rows)
+
+    def rows(self):
+        return [
+            {"fecha": fecha, **values}
+            for fecha, values in self._rows.items()
+            if any(values.values())
+        ]
+
+def business_date(fecha):
+    """Colombia business date of an order timestamp or expense date"""
+    if hasattr(fecha, "hour"):
+        return to_colombia_time(fecha).date()
+    return fecha
+
+def apply_daily_deltas(db: Session, deltas: DailyDeltas):
+    """Add the accumulated deltas to resumen_diario within the caller's transaction"""
+    rows = deltas.rows()
+    if not rows:
+        return
+
+    stmt = insert(ResumenDiario)
+    table = ResumenDiario.__table__
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[table.c.fecha],
+        set_={
+            **{field: table.c[field] + stmt.excluded[field] for field in ROLLUP_FIELDS},
+            "updated_at": func.now()
+        }
+    )
+    db.execute(stmt, rows)
@@ -2,7 +2,7 @@ from fastapi import APIRouter, HTTPException, status, Depends
 from typing import List
 from sqlalchemy.orm import Session
 from database import get_db
-from sql_models import Cliente, Pedido
+from sql_models import Cliente, Pedido, PagoRecibido
 from models import Client, ClientCreate, ClientUpdate
 
 router = APIRouter()
@@ -51,7 +51,7 @@ def update_client(client_id: int, client: ClientUpdate, db: Session = Depends(ge
 
 @router.delete("/{client_id}")
 def delete_client(client_id: int, db: Session = Depends(get_db)):
-    """Delete a client if they have no associated orders"""
+    """Delete a client if they have no associated orders or payments"""
     
     db_client = db.query(Cliente).filter(Cliente.id == client_id).first()
     if not db_client:
@@ -65,6 +65,15 @@ def delete_client(client_id: int, db: Session = Depends(get_db)):
             detail="No se puede eliminar el cliente porque tiene pedidos registrados. Primero debe eliminar o reasignar sus pedidos."
         )
     
+    # Deleting the client cascades to its payments without updating the
+    # payment-method balances, so payments must be deleted through the API first
+    has_payments = db.query(PagoRecibido.id).filter(PagoRecibido.cliente_id == client_id).first()
+    if has_payments:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="No se puede eliminar el cliente porque tiene pagos registrados. Primero debe eliminar sus pagos."
+        )
+    
     try:
         db.delete(db_client)
         db.commit()
@@ -1,57 +1,178 @@
-from fastapi import APIRouter, HTTPException, status, Depends
-from typing import List, Optional
+import calendar
+from datetime import date, datetime
+from fastapi import APIRouter, HTTPException, status, Depends, Query, Response
+from typing import List, Optional, Union
+from sqlalchemy import func, tuple_
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.orm import Session, joinedload
 from database import get_db
-from sql_models import Gasto, Proveedor
-from models import Expense, ExpenseCreate
-from utils import get_now_colombia
+from sql_models import Gasto, GastoRecurrente, Proveedor
+from models import (
+    Expense, ExpenseCreate, ExpensePage, ExpenseBulkResponse,
+    RecurringExpense, RecurringExpenseCreate, RecurringExpenseGenerate
+)
+from utils import get_now_colombia, parse_local_date, encode_cursor, decode_cursor
+from cache import invalidate_reports
+from rollups import DailyDeltas, apply_daily_deltas
+from ledger import BalanceDeltas, apply_balance_deltas
 
 router = APIRouter()
 
-@router.get("/", response_model=List[Expense])
+def expense_to_dict(expense: Gasto, proveedor_nombre: Optional[str] = None):
+    return {
+        "id": expense.id,
+        "concepto": expense.concepto,
+        "categoria": expense.categoria,
+        "tipo_gasto": expense.tipo_gasto,
+        "fecha": expense.fecha,
+        "valor": float(expense.valor),
+        "proveedor_id": expense.proveedor_id,
+        "medio_pago_id": expense.medio_pago_id,
+        "pedido_id": expense.pedido_id,
+        "observaciones": expense.observaciones,
+        "fecha_pago": expense.fecha_pago,
+        "gasto_recurrente_id": expense.gasto_recurrente_id,
+        "periodo": expense.periodo,
+        "created_at": expense.created_at,
+        "proveedor_nombre": proveedor_nombre
+    }
+
+@router.get("/", response_model=Union[List[Expense], ExpensePage])
 def get_expenses(
+    response: Response,
     start_date: Optional[str] = None,
     end_date: Optional[str] = None,
+    categoria: Optional[str] = None,
+    proveedor_id: Optional[int] = None,
+    medio_pago_id: Optional[int] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=500),
+    include_totals: bool = False,
     db: Session = Depends(get_db)
 ):
-    """Get expenses with optional date filtering"""
-    query = db.query(Gasto).outerjoin(Proveedor).order_by(Gasto.fecha.desc())
-    
-    if start_date and end_date:
-        # Parse dates
-        query = query.filter(Gasto.fecha >= start_date, Gasto.fecha <= end_date)
-    else:
-        query = query.limit(100)
-    
-    expenses = query.all()
-    
-    # Convert to dict and add proveedor_nombre
-    result = []
-    for expense in expenses:
-        expense_dict = {
-            "id": expense.id,
-            "concepto": expense.concepto,
-            "categoria": expense.categoria,
-            "tipo_gasto": expense.tipo_gasto,
-            "fecha": expense.fecha,
-            "valor": float(expense.valor),
-            "proveedor_id": expense.proveedor_id,
-            "medio_pago_id": expense.medio_pago_id,
-            "pedido_id": expense.pedido_id,
-            "observaciones": expense.observaciones,
-            "created_at": expense.created_at,
-            "proveedor_nombre": None
-        }
-        
-        # Get proveedor nombre if exists
-        if expense.proveedor_id:
-            proveedor = db.query(Proveedor).filter(Proveedor.id == expense.proveedor_id).first()
-            if proveedor:
-                expense_dict["proveedor_nombre"] = proveedor.nombre
-        
-        result.append(expense_dict)
+    """Get expenses with optional filters, newest first.
+
+    The supplier name comes from the same joined query. Pages are
+    keyset-paginated on (fecha, id): when more rows exist the X-Next-Cursor
+    header carries the cursor to request the next page.
+    include_totals=true returns {"gastos", "totales_por_categoria"}, the
+    totals covering every expense matching the filters, not just the page.
+    """
+    try:
+        start = parse_local_date(start_date) if start_date else None
+        end = parse_local_date(end_date) if end_date else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid date format. Use YYYY-MM-DD")
+    
+    after = None
+    if cursor:
+        try:
+            last_fecha, last_id = decode_cursor(cursor)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        after = (last_fecha.date(), last_id)
     
-    return result
+    query = expenses_query(db, start, end, categoria, proveedor_id, medio_pago_id)
+    
+    totals = None
+    if include_totals:
+        totals = expense_totals_query(query).all()
+    
+    rows = expenses_page_query(query, after).limit(limit + 1).all()
+    
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1][0]
+        response.headers["X-Next-Cursor"] = encode_cursor(last.fecha, last.id)
+    
+    result = [expense_to_dict(expense, proveedor_nombre) for expense, proveedor_nombre in rows]
+    
+    if totals is None:
+        return result
+    return {
+        "gastos": result,
+        "totales_por_categoria": [
+            {"categoria": categoria, "total": float(total or 0), "cantidad": cantidad}
+            for categoria, total, cantidad in totals
+        ]
+    }
+
+def expenses_query(db: Session, start: Optional[date] = None, end: Optional[date] = None,
+                   categoria: Optional[str] = None, proveedor_id: Optional[int] = None,
+                   medio_pago_id: Optional[int] = None):
+    """Expenses matching the GET / filters, unordered"""
+    query = db.query(Gasto)
+    
+    if start:
+        query = query.filter(Gasto.fecha >= start)
+    if end:
+        query = query.filter(Gasto.fecha <= end)
+    
+    if categoria:
+        query = query.filter(Gasto.categoria == categoria)
+    
+    if proveedor_id:
+        query = query.filter(Gasto.proveedor_id == proveedor_id)
+    
+    if medio_pago_id:
+        query = query.filter(Gasto.medio_pago_id == medio_pago_id)
+    
+    return query
+
+def expenses_page_query(query, after=None):
+    """(expense, supplier name) rows of an expenses_query, newest first.
+    after is the (fecha, id) of the last expense of the previous page."""
+    if after:
+        query = query.filter(tuple_(Gasto.fecha, Gasto.id) < after)
+    return query.add_columns(Proveedor.nombre).outerjoin(
+        Proveedor, Proveedor.id == Gasto.proveedor_id
+    ).order_by(Gasto.fecha.desc(), Gasto.id.desc())
+
+def expense_totals_query(query):
+    """(categoria, total, count) of an expenses_query, largest total first"""
+    return query.with_entities(
+        Gasto.categoria, func.sum(Gasto.valor), func.count(Gasto.id)
+    ).group_by(Gasto.categoria).order_by(func.sum(Gasto.valor).desc())
+
+def insert_expense_rows(db: Session, rows, skip_generated: bool = False):
+    """Insert expense rows with one batched INSERT and apply their rollup and
+    payment-method balance deltas in the caller's transaction.
+
+    With skip_generated, rows whose (gasto_recurrente_id, periodo) already
+    exists are skipped by ON CONFLICT DO NOTHING and only the rows actually
+    inserted count towards the deltas. Returns the new ids.
+    """
+    if not rows:
+        return []
+
+    stmt = insert(Gasto)
+    if skip_generated:
+        stmt = stmt.on_conflict_do_nothing(index_elements=[Gasto.gasto_recurrente_id, Gasto.periodo])
+    inserted = db.execute(
+        stmt.returning(Gasto.id, Gasto.fecha, Gasto.valor, Gasto.medio_pago_id), rows
+    ).all()
+
+    deltas = DailyDeltas()
+    balances = BalanceDeltas()
+    for _, fecha, valor, medio_pago_id in inserted:
+        deltas.add_expense(fecha, valor)
+        balances.add_expense(medio_pago_id, fecha, valor)
+    apply_daily_deltas(db, deltas)
+    apply_balance_deltas(db, balances)
+    return [row[0] for row in inserted]
+
+@router.post("/bulk", response_model=ExpenseBulkResponse, status_code=status.HTTP_201_CREATED)
+def create_expenses_bulk(expenses: List[ExpenseCreate], db: Session = Depends(get_db)):
+    """Create several expenses in one transaction with one batched INSERT"""
+    try:
+        ids = insert_expense_rows(db, [expense.dict() for expense in expenses])
+        db.commit()
+        if ids:
+            invalidate_reports()
+        return {"created": len(ids), "skipped": 0, "ids": ids}
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(status_code=500, detail=str(e))
 
 @router.post("/", response_model=Expense, status_code=status.HTTP_201_CREATED)
 def create_expense(expense: ExpenseCreate, db: Session = Depends(get_db)):
@@ -61,24 +182,21 @@ def create_expense(expense: ExpenseCreate, db: Session = Depends(get_db)):
         
         db_expense = Gasto(**expense_data)
         db.add(db_expense)
+        
+        deltas = DailyDeltas()
+        deltas.add_expense(db_expense.fecha, db_expense.valor)
+        apply_daily_deltas(db, deltas)
+        
+        balances = BalanceDeltas()
+        balances.add_expense(db_expense.medio_pago_id, db_expense.fecha, db_expense.valor)
+        apply_balance_deltas(db, balances)
+        
         db.commit()
+        invalidate_reports()
         db.refresh(db_expense)
         
         # Get proveedor nombre for response
-        expense_dict = {
-            "id": db_expense.id,
-            "concepto": db_expense.concepto,
-            "categoria": db_expense.categoria,
-            "tipo_gasto": db_expense.tipo_gasto,
-            "fecha": db_expense.fecha,
-            "valor": float(db_expense.valor),
-            "proveedor_id": db_expense.proveedor_id,
-            "medio_pago_id": db_expense.medio_pago_id,
-            "pedido_id": db_expense.pedido_id,
-            "observaciones": db_expense.observaciones,
-            "created_at": db_expense.created_at,
-            "proveedor_nombre": None
-        }
+        expense_dict = expense_to_dict(db_expense)
         
         if db_expense.proveedor_id:
             proveedor = db.query(Proveedor).filter(Proveedor.id == db_expense.proveedor_id).first()
@@ -97,27 +215,25 @@ def update_expense(expense_id: int, expense_update: ExpenseCreate, db: Session =
     if not db_expense:
         raise HTTPException(status_code=404, detail="Expense not found")
     
+    deltas = DailyDeltas()
+    deltas.add_expense(db_expense.fecha, db_expense.valor, sign=-1)
+    balances = BalanceDeltas()
+    balances.add_expense(db_expense.medio_pago_id, db_expense.fecha, db_expense.valor, sign=-1)
+    
     for key, value in expense_update.dict(exclude_unset=True).items():
         setattr(db_expense, key, value)
     
+    deltas.add_expense(db_expense.fecha, db_expense.valor)
+    apply_daily_deltas(db, deltas)
+    balances.add_expense(db_expense.medio_pago_id, db_expense.fecha, db_expense.valor)
+    apply_balance_deltas(db, balances)
+    
     db.commit()
+    invalidate_reports()
     db.refresh(db_expense)
     
     # Get proveedor nombre for response
-    expense_dict = {
-        "id": db_expense.id,
-        "concepto": db_expense.concepto,
-        "categoria": db_expense.categoria,
-        "tipo_gasto": db_expense.tipo_gasto,
-        "fecha": db_expense.fecha,
-        "valor": float(db_expense.valor),
-        "proveedor_id": db_expense.proveedor_id,
-        "medio_pago_id": db_expense.medio_pago_id,
-        "pedido_id": db_expense.pedido_id,
-        "observaciones": db_expense.observaciones,
-        "created_at": db_expense.created_at,
-        "proveedor_nombre": None
-    }
+    expense_dict = expense_to_dict(db_expense)
     
     if db_expense.proveedor_id:
         proveedor = db.query(Proveedor).filter(Proveedor.id == db_expense.proveedor_id).first()
@@ -133,6 +249,126 @@ def delete_expense(expense_id: int, db: Session = Depends(get_db)):
     if not db_expense:
         raise HTTPException(status_code=404, detail="Expense not found")
     
+    deltas = DailyDeltas()
+    deltas.add_expense(db_expense.fecha, db_expense.valor, sign=-1)
+    apply_daily_deltas(db, deltas)
+    
+    balances = BalanceDeltas()
+    balances.add_expense(db_expense.medio_pago_id, db_expense.fecha, db_expense.valor, sign=-1)
+    apply_balance_deltas(db, balances)
+    
     db.delete(db_expense)
     db.commit()
+    invalidate_reports()
     return {"message": "Expense deleted"}
+
+# --- Recurring expenses ---
+
+RECURRING_EXPENSE_TYPES = ('fijo', 'variable')
+
+def validate_recurring(template: RecurringExpenseCreate):
+    if not 1 <= template.dia_mes <= 31:
+        raise HTTPException(status_code=400, detail="dia_mes must be between 1 and 31")
+    if template.tipo_gasto not in RECURRING_EXPENSE_TYPES:
+        raise HTTPException(status_code=400, detail="tipo_gasto must be 'fijo' or 'variable'")
+
+def parse_period(value: Optional[str]) -> date:
+    """First day of a YYYY-MM month; the current month if value is empty"""
+    if not value:
+        return get_now_colombia().date().replace(day=1)
+    try:
+        return datetime.strptime(value[:7], "%Y-%m").date()
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid period format. Use YYYY-MM")
+
+@router.get("/recurring", response_model=List[RecurringExpense])
+def get_recurring_expenses(db: Session = Depends(get_db)):
+    """Get recurring expense templates"""
+    return db.query(GastoRecurrente).order_by(GastoRecurrente.dia_mes, GastoRecurrente.id).all()
+
+@router.post("/recurring", response_model=RecurringExpense, status_code=status.HTTP_201_CREATED)
+def create_recurring_expense(template: RecurringExpenseCreate, db: Session = Depends(get_db)):
+    """Create a recurring expense template"""
+    validate_recurring(template)
+    try:
+        db_template = GastoRecurrente(**template.dict())
+        db.add(db_template)
+        db.commit()
+        db.refresh(db_template)
+        return db_template
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.put("/recurring/{template_id}", response_model=RecurringExpense)
+def update_recurring_expense(template_id: int, template: RecurringExpenseCreate, db: Session = Depends(get_db)):
+    """Update a recurring expense template; expenses already generated are not changed"""
+    validate_recurring(template)
+    db_template = db.query(GastoRecurrente).filter(GastoRecurrente.id == template_id).first()
+    if not db_template:
+        raise HTTPException(status_code=404, detail="Recurring expense not found")
+    
+    try:
+        for key, value in template.dict(exclude_unset=True).items():
+            setattr(db_template, key, value)
+        
+        db.commit()
+        db.refresh(db_template)
+        return db_template
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.delete("/recurring/{template_id}")
+def delete_recurring_expense(template_id: int, db: Session = Depends(get_db)):
+    """Delete a recurring expense template; expenses already generated are kept"""
+    db_template = db.query(GastoRecurrente).filter(GastoRecurrente.id == template_id).first()
+    if not db_template:
+        raise HTTPException(status_code=404, detail="Recurring expense not found")
+    
+    db.delete(db_template)
+    db.commit()
+    return {"message": "Recurring expense deleted"}
+
+@router.post("/recurring/generate", response_model=ExpenseBulkResponse, status_code=status.HTTP_201_CREATED)
+def generate_recurring_expenses(request: RecurringExpenseGenerate, db: Session = Depends(get_db)):
+    """Materialize one expense per active template for a month.
+
+    All rows go in one batched INSERT. Templates already generated for the
+    period are skipped (unique gasto_recurrente_id, periodo), so running it
+    again for the same month is safe. Daily rollups and payment-method
+    balances are updated with the inserted rows only.
+    """
+    periodo = parse_period(request.periodo)
+    last_day = calendar.monthrange(periodo.year, periodo.month)[1]
+    
+    query = db.query(GastoRecurrente).filter(GastoRecurrente.activo == True)
+    if request.ids:
+        query = query.filter(GastoRecurrente.id.in_(request.ids))
+    templates = query.order_by(GastoRecurrente.id).all()
+    
+    rows = [
+        {
+            "concepto": template.concepto,
+            "categoria": template.categoria,
+            "tipo_gasto": template.tipo_gasto,
+            "fecha": periodo.replace(day=min(template.dia_mes, last_day)),
+            "valor": template.valor,
+            "proveedor_id": template.proveedor_id,
+            "medio_pago_id": template.medio_pago_id,
+            "observaciones": template.observaciones,
+            "gasto_recurrente_id": template.id,
+            "periodo": periodo
+        }
+        for template in templates
+    ]
+    
+    try:
+        ids = insert_expense_rows(db, rows, skip_generated=True)
+        db.commit()
+        if ids:
+            invalidate_reports()
+        return {"created": len(ids), "skipped": len(rows) - len(ids), "ids": ids}
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(status_code=500, detail=str(e))
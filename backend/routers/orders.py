@@ -1,96 +1,272 @@
-from fastapi import APIRouter, HTTPException, status, Depends
-from typing import List
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, HTTPException, status, Depends, Query, Response
+from typing import List, Optional
+from collections import defaultdict, deque
+from decimal import Decimal
+from sqlalchemy import insert, update, delete, tuple_
+from sqlalchemy.orm import Session, joinedload, selectinload
 from database import get_db
-from sql_models import Pedido, DetallePedido, Producto, Cliente, PrecioCliente
-from models import OrderCreate, OrderResponse, OrderStatusUpdate
-from utils import get_now_colombia
+from sql_models import Pedido, DetallePedido, Cliente
+from models import OrderCreate, OrderItemCreate, OrderResponse, OrderStatusUpdate, BulkOrderResponse
+from utils import get_now_colombia, to_colombia_time, local_date_range, encode_cursor, decode_cursor
+from pricing import price_book
+from cache import invalidate_reports
+from rollups import DailyDeltas, apply_daily_deltas
+from client_balances import OPEN_STATES, refresh_client_balances, lock_client, get_client_credit, credit_limit_error
 
 router = APIRouter()
 
 @router.post("/", response_model=OrderResponse, status_code=status.HTTP_201_CREATED)
 def create_order(order: OrderCreate, db: Session = Depends(get_db)):
-    """Create a new order with automatic price calculation"""
+    """Create a new order with automatic price calculation.
+
+    The order and its details are flushed together (ids come back from the
+    INSERTs) and committed once; the response is built from the rows just
+    written instead of being read back. Open orders that would take the
+    client over its cupo_credito are rejected with 409 unless ignorar_cupo
+    is set, in which case they are saved and flagged with excede_cupo.
+    """
+    cliente = db.query(Cliente).filter(Cliente.id == order.cliente_id).first()
+    if not cliente:
+        raise HTTPException(status_code=400, detail=f"Client {order.cliente_id} not found")
+    
+    # Client lock first, before any pedidos or rollup write (see lock_order_client)
+    lock_client(db, cliente.id)
+    
     # 1. Calculate prices and totals
     total_order = 0
-    order_items_data = []
+    details = []
     
     for item in order.items:
-        # Get product
-        product = db.query(Producto).filter(Producto.id == item.producto_id).first()
-        if not product:
+        # Determine price (special client price or standard) from the price book
+        precio_aplicado = price_item(item, order.cliente_id, db)
+        if precio_aplicado is None:
             raise HTTPException(status_code=400, detail=f"Product {item.producto_id} not found")
         
-        # Determine price
-        if item.precio is not None and item.precio > 0:
-            precio_aplicado = float(item.precio)
-        else:
-            # Check for special price rule
-            price_rule = db.query(PrecioCliente).filter(
-                PrecioCliente.cliente_id == order.cliente_id,
-                PrecioCliente.producto_id == item.producto_id,
-                PrecioCliente.activo == True
-            ).first()
-            
-            if price_rule:
-                precio_aplicado = float(price_rule.precio_especial)
-            else:
-                precio_aplicado = float(product.precio_estandar)
-        
         subtotal = precio_aplicado * item.cantidad
         total_order += subtotal
         
-        order_items_data.append({
-            "producto_id": item.producto_id,
-            "cantidad": item.cantidad,
-            "precio_aplicado": precio_aplicado,
-            "subtotal": subtotal
-        })
+        details.append(DetallePedido(
+            producto_id=item.producto_id,
+            cantidad=item.cantidad,
+            precio_aplicado=precio_aplicado,
+            subtotal=subtotal
+        ))
     
     # 2. Add delivery fee if applicable
     domicilio = order.valor_domicilio if order.valor_domicilio else 0
     total_order += domicilio
     
-    # 3. Create order
-    order_data = {
-        "cliente_id": order.cliente_id,
-        "fecha": order.fecha if order.fecha else get_now_colombia(),
-        "total": total_order,
-        "valor_domicilio": domicilio,
-        "medio_pago_id": order.medio_pago_id,
-        "estado": order.estado or 'pendiente',
-        "observaciones": order.observaciones
+    # 3. Check the credit limit against the client's maintained balance
+    estado = order.estado or 'pendiente'
+    excede_cupo = False
+    if estado in OPEN_STATES and (cliente.cupo_credito or 0) > 0:
+        credit = get_client_credit(db, [cliente.id]).get(cliente.id)
+        error = credit_limit_error(cliente.id, credit, total_order)
+        if error:
+            if not order.ignorar_cupo:
+                raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=error)
+            excede_cupo = True
+    
+    # 4. Create order and details in a single transaction
+    db_order = Pedido(
+        cliente_id=order.cliente_id,
+        fecha=to_colombia_time(order.fecha) if order.fecha else get_now_colombia(),
+        total=total_order,
+        monto_pagado=0,
+        valor_domicilio=domicilio,
+        medio_pago_id=order.medio_pago_id,
+        estado=estado,
+        observaciones=order.observaciones,
+        cliente=cliente,
+        detalle=details
+    )
+    
+    try:
+        db.add(db_order)
+        db.flush()
+        
+        deltas = DailyDeltas()
+        deltas.add_order(db_order.fecha, db_order.estado, total_order, domicilio)
+        apply_daily_deltas(db, deltas)
+        refresh_client_balances(db, [db_order.cliente_id])
+        
+        # 5. Build the response before commit expires the instances
+        product_names = {d.producto_id: price_book.product_name(db, d.producto_id) for d in details}
+        response = build_order_responses([db_order], product_names)[0]
+        response["excede_cupo"] = excede_cupo
+        
+        db.commit()
+        invalidate_reports(deltas.dates())
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(status_code=500, detail=str(e))
+    
+    return response
+
+@router.post("/bulk", response_model=BulkOrderResponse, status_code=status.HTTP_201_CREATED)
+def create_orders_bulk(orders: List[OrderCreate], db: Session = Depends(get_db)):
+    """Create many orders in one transaction.
+
+    Clients are checked with one IN-list query and every line is priced from
+    the price book, then all orders and details are written with two batched
+    INSERTs. Orders that fail validation or would exceed the client's
+    cupo_credito (unless ignorar_cupo) are reported and skipped; the rest are
+    created.
+    """
+    cliente_ids = {order.cliente_id for order in orders}
+    existing_clients = {
+        cid for (cid,) in db.query(Cliente.id).filter(Cliente.id.in_(cliente_ids))
     }
     
-    db_order = Pedido(**order_data)
-    db.add(db_order)
-    db.commit()
-    db.refresh(db_order)
+    # Lock the clients in id order before reading balances so concurrent
+    # batches cannot both pass the same credit limit
+    for cid in sorted(existing_clients):
+        lock_client(db, cid)
+    credit = get_client_credit(db, existing_clients)
     
-    # 4. Create order details
-    for item_data in order_items_data:
-        item_data["pedido_id"] = db_order.id
-        db_detail = DetallePedido(**item_data)
-        db.add(db_detail)
+    results = []
+    order_rows = []
+    order_items = []
+    now = get_now_colombia()
     
-    db.commit()
+    for index, order in enumerate(orders):
+        if order.cliente_id not in existing_clients:
+            results.append({"index": index, "ok": False, "error": f"Client {order.cliente_id} not found"})
+            continue
+        
+        prices = [price_item(item, order.cliente_id, db) for item in order.items]
+        missing = [item.producto_id for item, precio in zip(order.items, prices) if precio is None]
+        if missing:
+            results.append({"index": index, "ok": False, "error": f"Product {missing[0]} not found"})
+            continue
+        
+        total_order = 0
+        items_data = []
+        for item, precio_aplicado in zip(order.items, prices):
+            subtotal = precio_aplicado * item.cantidad
+            total_order += subtotal
+            items_data.append({
+                "producto_id": item.producto_id,
+                "cantidad": item.cantidad,
+                "precio_aplicado": precio_aplicado,
+                "subtotal": subtotal
+            })
+        
+        domicilio = order.valor_domicilio if order.valor_domicilio else 0
+        total_order += domicilio
+        
+        estado = order.estado or 'pendiente'
+        excede_cupo = False
+        if estado in OPEN_STATES and order.cliente_id in credit:
+            error = credit_limit_error(order.cliente_id, credit[order.cliente_id], total_order)
+            if error:
+                if not order.ignorar_cupo:
+                    results.append({"index": index, "ok": False, "error": error})
+                    continue
+                excede_cupo = True
+            # Later orders of the batch see this one in the client's debt
+            cupo, deuda = credit[order.cliente_id]
+            credit[order.cliente_id] = (cupo, deuda + Decimal(str(total_order)))
+        
+        order_rows.append({
+            "cliente_id": order.cliente_id,
+            "fecha": to_colombia_time(order.fecha) if order.fecha else now,
+            "total": total_order,
+            "valor_domicilio": domicilio,
+            "medio_pago_id": order.medio_pago_id,
+            "estado": estado,
+            "observaciones": order.observaciones
+        })
+        order_items.append(items_data)
+        results.append({"index": index, "ok": True, "total": total_order, "excede_cupo": excede_cupo})
     
-    # 5. Return order with details
-    return get_order_response(db_order.id, db)
+    if order_rows:
+        try:
+            order_ids = db.scalars(
+                insert(Pedido).returning(Pedido.id, sort_by_parameter_order=True),
+                order_rows
+            ).all()
+            
+            detail_rows = [
+                {**item_data, "pedido_id": order_id}
+                for order_id, items_data in zip(order_ids, order_items)
+                for item_data in items_data
+            ]
+            if detail_rows:
+                db.execute(insert(DetallePedido), detail_rows)
+            
+            deltas = DailyDeltas()
+            for row in order_rows:
+                deltas.add_order(row["fecha"], row["estado"], row["total"], row["valor_domicilio"])
+            apply_daily_deltas(db, deltas)
+            refresh_client_balances(db, [row["cliente_id"] for row in order_rows])
+            
+            db.commit()
+            invalidate_reports(deltas.dates())
+        except Exception as e:
+            db.rollback()
+            raise HTTPException(status_code=500, detail=str(e))
+        
+        created = iter(order_ids)
+        for result in results:
+            if result["ok"]:
+                result["id"] = next(created)
+    
+    return {
+        "created": len(order_rows),
+        "failed": len(results) - len(order_rows),
+        "results": results
+    }
 
 @router.get("/", response_model=List[OrderResponse])
 def get_orders(
+    response: Response,
     start_date: str = None,
     end_date: str = None,
     cliente_id: int = None,
     estado: str = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=500),
     db: Session = Depends(get_db)
 ):
-    """Get orders with optional filters"""
-    query = db.query(Pedido).order_by(Pedido.fecha.desc())
-    
+    """Get orders with optional filters, newest first.
+
+    Pages are keyset-paginated on (fecha, id): when more rows exist the
+    X-Next-Cursor header carries the cursor to request the next page.
+    """
+    date_range = None
     if start_date and end_date:
-        query = query.filter(Pedido.fecha >= start_date, Pedido.fecha <= end_date)
+        try:
+            date_range = local_date_range(start_date, end_date)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid date format. Use YYYY-MM-DD")
+    
+    after = None
+    if cursor:
+        try:
+            after = decode_cursor(cursor)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    
+    query = orders_page_query(db, date_range, cliente_id, estado, after)
+    orders = query.options(*order_load_options()).limit(limit + 1).all()
+    
+    if len(orders) > limit:
+        orders = orders[:limit]
+        response.headers["X-Next-Cursor"] = encode_cursor(orders[-1].fecha, orders[-1].id)
+    
+    return build_order_responses(orders)
+
+def orders_page_query(db: Session, date_range=None, cliente_id: Optional[int] = None,
+                      estado: Optional[str] = None, after=None):
+    """Orders newest first, filtered like GET /orders. date_range is a
+    (start, end) pair of instants from local_date_range; after is the decoded
+    (fecha, id) cursor of the previous page."""
+    query = db.query(Pedido).order_by(Pedido.fecha.desc(), Pedido.id.desc())
+    
+    if date_range:
+        range_start, range_end = date_range
+        query = query.filter(Pedido.fecha >= range_start, Pedido.fecha < range_end)
     
     if cliente_id:
         query = query.filter(Pedido.cliente_id == cliente_id)
@@ -98,144 +274,258 @@ def get_orders(
     if estado:
         query = query.filter(Pedido.estado == estado)
     
-    orders = query.limit(100).all()
+    if after:
+        query = query.filter(tuple_(Pedido.fecha, Pedido.id) < after)
     
-    return [get_order_response(order.id, db) for order in orders]
+    return query
 
 @router.get("/{order_id}", response_model=OrderResponse)
 def get_order(order_id: int, db: Session = Depends(get_db)):
     """Get a specific order by ID"""
-    order = db.query(Pedido).filter(Pedido.id == order_id).first()
+    order = db.query(Pedido).options(*order_load_options()).filter(Pedido.id == order_id).first()
     if not order:
         raise HTTPException(status_code=404, detail="Order not found")
     
-    return get_order_response(order_id, db)
+    return build_order_responses([order])[0]
 
 @router.put("/{order_id}", response_model=OrderResponse)
 def update_order(order_id: int, order_update: OrderCreate, db: Session = Depends(get_db)):
-    """Update an existing order"""
-    db_order = db.query(Pedido).filter(Pedido.id == order_id).first()
+    """Update an existing order.
+
+    The submitted lines are diffed against the stored ones (matched by product)
+    so only changed lines are written, with one batched UPDATE, DELETE and
+    INSERT at most.
+    """
+    db_order = lock_order_client(db, order_id)
     if not db_order:
         raise HTTPException(status_code=404, detail="Order not found")
     
     try:
-        # Recalculate totals
-        total_order = 0
+        existing = db.query(DetallePedido).filter(
+            DetallePedido.pedido_id == order_id
+        ).order_by(DetallePedido.id).all()
+        
+        # Unmatched stored lines per product, oldest first
+        unmatched = defaultdict(deque)
+        for detail in existing:
+            unmatched[detail.producto_id].append(detail)
         
-        # Delete existing details
-        db.query(DetallePedido).filter(DetallePedido.pedido_id == order_id).delete()
+        total_order = 0
+        to_insert = []
+        to_update = []
         
-        # Add new details
         for item in order_update.items:
-            product = db.query(Producto).filter(Producto.id == item.producto_id).first()
-            if not product:
+            precio_aplicado = price_item(item, order_update.cliente_id, db)
+            if precio_aplicado is None:
                 continue
             
-            # Determine price
-            if item.precio is not None and item.precio > 0:
-                precio_aplicado = float(item.precio)
-            else:
-                price_rule = db.query(PrecioCliente).filter(
-                    PrecioCliente.cliente_id == order_update.cliente_id,
-                    PrecioCliente.producto_id == item.producto_id,
-                    PrecioCliente.activo == True
-                ).first()
-                
-                precio_aplicado = float(price_rule.precio_especial) if price_rule else float(product.precio_estandar)
-            
             subtotal = precio_aplicado * item.cantidad
             total_order += subtotal
             
-            db_detail = DetallePedido(
-                pedido_id=order_id,
-                producto_id=item.producto_id,
-                cantidad=item.cantidad,
-                precio_aplicado=precio_aplicado,
-                subtotal=subtotal
-            )
-            db.add(db_detail)
+            if unmatched[item.producto_id]:
+                detail = unmatched[item.producto_id].popleft()
+                if detail.cantidad != item.cantidad or float(detail.precio_aplicado) != precio_aplicado:
+                    to_update.append({
+                        "id": detail.id,
+                        "cantidad": item.cantidad,
+                        "precio_aplicado": precio_aplicado,
+                        "subtotal": subtotal
+                    })
+            else:
+                to_insert.append({
+                    "pedido_id": order_id,
+                    "producto_id": item.producto_id,
+                    "cantidad": item.cantidad,
+                    "precio_aplicado": precio_aplicado,
+                    "subtotal": subtotal
+                })
+        
+        to_delete = [detail.id for details in unmatched.values() for detail in details]
         
         # 2. Update order
         domicilio = order_update.valor_domicilio if order_update.valor_domicilio else 0
         total_order += domicilio
         
+        # Only a larger open debt is checked against the credit limit
+        estado = order_update.estado or db_order.estado
+        excede_cupo = False
+        if estado in OPEN_STATES:
+            monto_pagado = Decimal(str(db_order.monto_pagado or 0))
+            old_debt = max(Decimal(str(db_order.total)) - monto_pagado, 0) if db_order.estado in OPEN_STATES else 0
+            increase = max(Decimal(str(total_order)) - monto_pagado, 0) - old_debt
+            credit = None
+            if increase > 0:
+                credit = get_client_credit(db, [db_order.cliente_id]).get(db_order.cliente_id)
+            error = credit_limit_error(db_order.cliente_id, credit, increase)
+            if error:
+                if not order_update.ignorar_cupo:
+                    raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=error)
+                excede_cupo = True
+        
+        if to_update:
+            db.execute(update(DetallePedido), to_update)
+        if to_delete:
+            db.execute(delete(DetallePedido).where(DetallePedido.id.in_(to_delete)))
+        if to_insert:
+            db.execute(insert(DetallePedido), to_insert)
+        
+        deltas = DailyDeltas()
+        deltas.add_order(db_order.fecha, db_order.estado, db_order.total, db_order.valor_domicilio, sign=-1)
+        
         db_order.total = total_order
         db_order.valor_domicilio = domicilio
-        db_order.estado = order_update.estado or db_order.estado
+        db_order.estado = estado
         db_order.medio_pago_id = order_update.medio_pago_id
         db_order.observaciones = order_update.observaciones
         
+        deltas.add_order(db_order.fecha, db_order.estado, db_order.total, db_order.valor_domicilio)
+        apply_daily_deltas(db, deltas)
+        refresh_client_balances(db, [db_order.cliente_id])
+        
         db.commit()
+        invalidate_reports(deltas.dates())
         
-        return get_order_response(order_id, db)
+        return {**get_order_response(order_id, db), "excede_cupo": excede_cupo}
         
+    except HTTPException:
+        db.rollback()
+        raise
     except Exception as e:
         db.rollback()
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.patch("/{order_id}/status")
 def update_order_status(order_id: int, update_data: OrderStatusUpdate, db: Session = Depends(get_db)):
-    """Update only the order status and potentially the payment method"""
-    db_order = db.query(Pedido).filter(Pedido.id == order_id).first()
+    """Update only the order status and potentially the payment method.
+
+    Reopening an order (e.g. cancelado -> pendiente) puts its balance back on
+    the client's debt, so it goes through the same credit-limit check as
+    create_order: 409 unless ignorar_cupo, then flagged with excede_cupo.
+    """
+    db_order = lock_order_client(db, order_id)
     if not db_order:
         raise HTTPException(status_code=404, detail="Order not found")
     
+    excede_cupo = False
+    if update_data.estado in OPEN_STATES and db_order.estado not in OPEN_STATES:
+        debt = max(Decimal(str(db_order.total or 0)) - Decimal(str(db_order.monto_pagado or 0)), 0)
+        credit = get_client_credit(db, [db_order.cliente_id]).get(db_order.cliente_id)
+        error = credit_limit_error(db_order.cliente_id, credit, debt)
+        if error:
+            if not update_data.ignorar_cupo:
+                db.rollback()
+                raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=error)
+            excede_cupo = True
+    
+    deltas = DailyDeltas()
+    deltas.add_order(db_order.fecha, db_order.estado, db_order.total, db_order.valor_domicilio, sign=-1)
+    
     db_order.estado = update_data.estado
     if update_data.medio_pago_id is not None:
         db_order.medio_pago_id = update_data.medio_pago_id
+    
+    deltas.add_order(db_order.fecha, db_order.estado, db_order.total, db_order.valor_domicilio)
+    apply_daily_deltas(db, deltas)
+    refresh_client_balances(db, [db_order.cliente_id])
         
     db.commit()
+    invalidate_reports(deltas.dates())
     
-    return {"message": "Status updated", "estado": update_data.estado}
+    return {"message": "Status updated", "estado": update_data.estado, "excede_cupo": excede_cupo}
 
 @router.delete("/{order_id}")
 def delete_order(order_id: int, db: Session = Depends(get_db)):
     """Delete an order and its details"""
-    db_order = db.query(Pedido).filter(Pedido.id == order_id).first()
+    db_order = lock_order_client(db, order_id)
     if not db_order:
         raise HTTPException(status_code=404, detail="Order not found")
     
+    deltas = DailyDeltas()
+    deltas.add_order(db_order.fecha, db_order.estado, db_order.total, db_order.valor_domicilio, sign=-1)
+    apply_daily_deltas(db, deltas)
+    
     # Details will be deleted automatically due to CASCADE
     db.delete(db_order)
+    refresh_client_balances(db, [db_order.cliente_id])
     db.commit()
+    invalidate_reports(deltas.dates())
     
     return {"message": "Order deleted"}
 
-# Helper function
+# Helper functions
+def lock_order_client(db: Session, order_id: int) -> Optional[Pedido]:
+    """Load an order with its client's lock held, or None if it does not exist.
+
+    Every writer takes the client lock before touching pedidos, resumen_diario
+    or saldo_cliente (and payments before the method balances), so order
+    edits, payments and bulk writes always lock in the same order. The order
+    is re-read under the lock so its totals and estado are current.
+    """
+    db_order = db.query(Pedido).filter(Pedido.id == order_id).first()
+    if db_order is None:
+        return None
+    lock_client(db, db_order.cliente_id)
+    db.refresh(db_order)
+    return db_order
+
+def price_item(item: OrderItemCreate, cliente_id: int, db: Session) -> Optional[float]:
+    """Price applied to an order line, or None if the product does not exist.
+    An explicit positive price on the line overrides the price book."""
+    precio = price_book.price_for(db, cliente_id, item.producto_id)
+    if precio is not None and item.precio is not None and item.precio > 0:
+        return float(item.precio)
+    return precio
+
+def order_load_options():
+    """Eager-load options so a batch of orders costs a fixed number of queries:
+    the client is joined in, details and their products come in one IN-list query."""
+    return (
+        joinedload(Pedido.cliente),
+        selectinload(Pedido.detalle).joinedload(DetallePedido.producto),
+    )
+
+def build_order_responses(orders: List[Pedido], product_names: Optional[dict] = None):
+    """Build order responses from orders loaded with order_load_options().
+    product_names (producto_id -> nombre) replaces the producto relationship
+    for orders that were just written and have no products loaded."""
+    result = []
+    for order in orders:
+        items = []
+        for detail in sorted(order.detalle, key=lambda d: d.id):
+            if product_names is not None:
+                producto_nombre = product_names.get(detail.producto_id)
+            else:
+                producto_nombre = detail.producto.nombre if detail.producto else None
+            
+            items.append({
+                "id": detail.id,
+                "producto_id": detail.producto_id,
+                "producto_nombre": producto_nombre or "Desconocido",
+                "cantidad": detail.cantidad,
+                "precio_aplicado": float(detail.precio_aplicado),
+                "subtotal": float(detail.subtotal)
+            })
+        
+        result.append({
+            "id": order.id,
+            "cliente_id": order.cliente_id,
+            "cliente_nombre": order.cliente.nombre if order.cliente else "Desconocido",
+            "fecha": order.fecha,
+            "total": float(order.total),
+            "monto_pagado": float(order.monto_pagado or 0),
+            "valor_domicilio": float(order.valor_domicilio or 0),
+            "medio_pago_id": order.medio_pago_id,
+            "estado": order.estado,
+            "observaciones": order.observaciones,
+            "items": items
+        })
+    
+    return result
+
 def get_order_response(order_id: int, db: Session):
     """Build order response with all details"""
-    order = db.query(Pedido).filter(Pedido.id == order_id).first()
+    order = db.query(Pedido).options(*order_load_options()).filter(Pedido.id == order_id).first()
     if not order:
         return None
     
-    # Get client
-    cliente = db.query(Cliente).filter(Cliente.id == order.cliente_id).first()
-    
-    # Get details
-    details = db.query(DetallePedido).filter(DetallePedido.pedido_id == order_id).all()
-    
-    items = []
-    for detail in details:
-        producto = db.query(Producto).filter(Producto.id == detail.producto_id).first()
-        items.append({
-            "id": detail.id,
-            "producto_id": detail.producto_id,
-            "producto_nombre": producto.nombre if producto else "Desconocido",
-            "cantidad": detail.cantidad,
-            "precio_aplicado": float(detail.precio_aplicado),
-            "subtotal": float(detail.subtotal)
-        })
-    
-    return {
-        "id": order.id,
-        "cliente_id": order.cliente_id,
-        "cliente_nombre": cliente.nombre if cliente else "Desconocido",
-        "fecha": order.fecha,
-        "total": float(order.total),
-        "monto_pagado": float(order.monto_pagado or 0),
-        "valor_domicilio": float(order.valor_domicilio or 0),
-        "medio_pago_id": order.medio_pago_id,
-        "estado": order.estado,
-        "observaciones": order.observaciones,
-        "items": items
-    }
+    return build_order_responses([order])[0]
@@ -4,6 +4,7 @@ from sqlalchemy.orm import Session
 from database import get_db
 from sql_models import Producto
 from models import Product, ProductCreate
+from pricing import price_book
 
 router = APIRouter()
 
@@ -18,6 +19,11 @@ def get_products(
         query = query.filter(Producto.activo == True)
     return query.all()
 
+@router.get("/price-book")
+def get_price_book_stats():
+    """Hit/miss counters and size of the in-process price book"""
+    return price_book.stats()
+
 @router.post("/", response_model=Product, status_code=status.HTTP_201_CREATED)
 def create_product(product: ProductCreate, db: Session = Depends(get_db)):
     """Create a new product"""
@@ -26,6 +32,7 @@ def create_product(product: ProductCreate, db: Session = Depends(get_db)):
         db.add(db_product)
         db.commit()
         db.refresh(db_product)
+        price_book.invalidate()
         return db_product
     except Exception as e:
         db.rollback()
@@ -43,4 +50,5 @@ def update_product(product_id: int, product: ProductCreate, db: Session = Depend
     
     db.commit()
     db.refresh(db_product)
+    price_book.invalidate()
     return db_product
@@ -1,12 +1,19 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Query, Response, UploadFile, File
 from sqlalchemy.orm import Session
-from sqlalchemy import func, text
-from typing import List
+from sqlalchemy import func, text, tuple_
+from typing import List, Optional
+from collections import defaultdict
+import io
 from database import get_db
 from sql_models import PagoRecibido, Pedido, Cliente, MedioPago, PagoPedido
-from models import PaymentReceivedCreate, PaymentReceived
+from models import PaymentReceivedCreate, PaymentReceived, PaymentBulkDelete
 from auth import get_current_user
-from utils import get_now_colombia
+from utils import get_now_colombia, local_date_range, encode_cursor, decode_cursor
+from cache import invalidate_reports
+from ledger import BalanceDeltas, apply_balance_deltas
+from allocation import allocate_payments, reverse_payments
+from payment_import import import_statement
+from client_balances import get_aging_by_client, get_client_balances, lock_client, refresh_client_balances
 
 router = APIRouter(tags=["Receivables"])
 
@@ -16,67 +23,121 @@ def ping():
     return {"status": "ok"}
 
 @router.get("/history", dependencies=[Depends(get_current_user)])
-def get_payment_history(db: Session = Depends(get_db)):
-    """Get recent payment history"""
-    payments = db.query(PagoRecibido).order_by(PagoRecibido.fecha.desc()).limit(50).all()
+def get_payment_history(
+    response: Response,
+    cliente_id: Optional[int] = None,
+    metodo_pago_id: Optional[int] = None,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=500),
+    include_allocations: bool = False,
+    db: Session = Depends(get_db)
+):
+    """Get payment history with optional filters, newest first.
+
+    Client and payment method names come from the same joined query. Pages
+    are keyset-paginated on (fecha, id): when more rows exist the
+    X-Next-Cursor header carries the cursor to request the next page.
+    include_allocations=true adds the orders each payment was applied to,
+    loaded with one extra query per page.
+    """
+    date_range = None
+    if start_date and end_date:
+        try:
+            date_range = local_date_range(start_date, end_date)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid date format. Use YYYY-MM-DD")
     
-    result = []
-    for pago in payments:
-        cliente = db.query(Cliente).filter(Cliente.id == pago.cliente_id).first()
-        medio = db.query(MedioPago).filter(MedioPago.id == pago.metodo_pago_id).first()
-        
-        result.append({
+    after = None
+    if cursor:
+        try:
+            after = decode_cursor(cursor)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    
+    query = payment_history_query(db, date_range, cliente_id, metodo_pago_id, after)
+    rows = query.limit(limit + 1).all()
+    
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1][0]
+        response.headers["X-Next-Cursor"] = encode_cursor(last.fecha, last.id)
+    
+    result = [
+        {
             "id": pago.id,
             "cliente_id": pago.cliente_id,
-            "cliente": cliente.nombre if cliente else "Desconocido",
+            "cliente": cliente_nombre or "Desconocido",
             "monto": float(pago.monto),
             "fecha": pago.fecha,
             "descripcion": pago.descripcion,
             "metodo_pago_id": pago.metodo_pago_id,
-            "medio_pago": medio.nombre if medio else "-"
-        })
+            "medio_pago": medio_nombre or "-"
+        }
+        for pago, cliente_nombre, medio_nombre in rows
+    ]
+    
+    if include_allocations and result:
+        allocations = defaultdict(list)
+        links = payment_allocations_query(db, [payment["id"] for payment in result]).all()
+        for pago_id, pedido_id, monto, pedido_fecha in links:
+            allocations[pago_id].append({
+                "pedido_id": pedido_id,
+                "monto": float(monto),
+                "pedido_fecha": pedido_fecha
+            })
+        for payment in result:
+            payment["asignaciones"] = allocations.get(payment["id"], [])
     
     return result
 
-@router.get("/accounts", dependencies=[Depends(get_current_user)])
-def get_receivable_accounts(db: Session = Depends(get_db)):
-    """Get accounts receivable grouped by client"""
-    # Query pending or partially paid orders
-    pending_orders = db.query(Pedido).filter(Pedido.estado.in_(['pendiente', 'parcial'])).all()
+def payment_history_query(db: Session, date_range=None, cliente_id: Optional[int] = None,
+                          metodo_pago_id: Optional[int] = None, after=None):
+    """(payment, client name, method name) rows newest first, filtered like
+    GET /history. date_range is a (start, end) pair of instants from
+    local_date_range; after is the decoded (fecha, id) cursor of the previous page."""
+    query = db.query(
+        PagoRecibido, Cliente.nombre, MedioPago.nombre
+    ).outerjoin(
+        Cliente, Cliente.id == PagoRecibido.cliente_id
+    ).outerjoin(
+        MedioPago, MedioPago.id == PagoRecibido.metodo_pago_id
+    ).order_by(PagoRecibido.fecha.desc(), PagoRecibido.id.desc())
     
-    if not pending_orders:
-        return []
+    if date_range:
+        range_start, range_end = date_range
+        query = query.filter(PagoRecibido.fecha >= range_start, PagoRecibido.fecha < range_end)
     
-    # Group by client
-    clients_map = {}
+    if cliente_id:
+        query = query.filter(PagoRecibido.cliente_id == cliente_id)
     
-    for order in pending_orders:
-        cid = order.cliente_id
-        debt = float(order.total) - float(order.monto_pagado or 0)
-        
-        if debt <= 0:
-            continue
-        
-        if cid not in clients_map:
-            cliente = db.query(Cliente).filter(Cliente.id == cid).first()
-            order_date = order.fecha or order.created_at
-            clients_map[cid] = {
-                "cliente_id": cid,
-                "nombre": cliente.nombre if cliente else "Desconocido",
-                "total_deuda": 0,
-                "ordenes_pendientes": 0,
-                "fecha_mas_antigua": order_date
-            }
-        
-        clients_map[cid]['total_deuda'] += debt
-        clients_map[cid]['ordenes_pendientes'] += 1
-        
-        # Keep oldest date
-        order_date = order.fecha or order.created_at
-        if order_date and (not clients_map[cid]['fecha_mas_antigua'] or order_date < clients_map[cid]['fecha_mas_antigua']):
-            clients_map[cid]['fecha_mas_antigua'] = order_date
+    if metodo_pago_id:
+        query = query.filter(PagoRecibido.metodo_pago_id == metodo_pago_id)
+    
+    if after:
+        query = query.filter(tuple_(PagoRecibido.fecha, PagoRecibido.id) < after)
+    
+    return query
+
+def payment_allocations_query(db: Session, pago_ids):
+    """Links of the given payments to the orders they were applied to, with the order date"""
+    return db.query(
+        PagoPedido.pago_id, PagoPedido.pedido_id, PagoPedido.monto, Pedido.fecha
+    ).outerjoin(
+        Pedido, Pedido.id == PagoPedido.pedido_id
+    ).filter(
+        PagoPedido.pago_id.in_(list(pago_ids))
+    ).order_by(PagoPedido.id)
+
+@router.get("/accounts", dependencies=[Depends(get_current_user)])
+def get_receivable_accounts(compact: bool = False, db: Session = Depends(get_db)):
+    """Get accounts receivable grouped by client, read from saldo_cliente.
+    compact=true computes the totals and age buckets per client in SQL."""
+    if compact:
+        return get_aging_by_client(db, get_now_colombia().date())
     
-    return list(clients_map.values())
+    return get_client_balances(db)
 
 @router.post("/payments", response_model=PaymentReceived, dependencies=[Depends(get_current_user)])
 def register_payment(payment: PaymentReceivedCreate, db: Session = Depends(get_db)):
@@ -89,50 +150,23 @@ def register_payment(payment: PaymentReceivedCreate, db: Session = Depends(get_d
         
         db_payment = PagoRecibido(**payment_data)
         db.add(db_payment)
-        db.commit()
-        db.refresh(db_payment)
+        db.flush()
         
-        payment_id = db_payment.id
-        remaining_amount = float(payment.monto)
+        # Client lock before the saldos_medio_pago row, the same order as
+        # the statement import and payment reversal, so they cannot deadlock
+        lock_client(db, db_payment.cliente_id)
         
-        # 2. Apply to oldest pending orders (FIFO)
-        pending_orders = db.query(Pedido).filter(
-            Pedido.cliente_id == payment.cliente_id,
-            Pedido.estado.in_(['pendiente', 'parcial'])
-        ).order_by(Pedido.fecha, Pedido.id).all()
+        balances = BalanceDeltas()
+        balances.add_payment(db_payment.metodo_pago_id, db_payment.fecha, db_payment.monto)
+        apply_balance_deltas(db, balances)
         
-        for order in pending_orders:
-            if remaining_amount <= 0:
-                break
-            
-            order_debt = float(order.total) - float(order.monto_pagado or 0)
-            
-            if order_debt <= 0:
-                continue
-            
-            # Calculate amount to apply to this order
-            amount_to_apply = min(remaining_amount, order_debt)
-            
-            # Create payment-order link
-            pago_pedido = PagoPedido(
-                pago_id=payment_id,
-                pedido_id=order.id,
-                monto=amount_to_apply
-            )
-            db.add(pago_pedido)
-            
-            # Update order
-            order.monto_pagado = float(order.monto_pagado or 0) + amount_to_apply
-            
-            # Update order status
-            if order.monto_pagado >= order.total:
-                order.estado = 'pagado'
-            elif order.monto_pagado > 0:
-                order.estado = 'parcial'
-            
-            remaining_amount -= amount_to_apply
+        # 2. Apply to oldest pending orders (FIFO) in the same transaction
+        _, order_dates = allocate_payments(db, db_payment.cliente_id, [(db_payment.id, db_payment.monto)])
+        refresh_client_balances(db, [db_payment.cliente_id])
         
         db.commit()
+        invalidate_reports(order_dates)
+        db.refresh(db_payment)
         
         return db_payment
         
@@ -140,44 +174,65 @@ def register_payment(payment: PaymentReceivedCreate, db: Session = Depends(get_d
         db.rollback()
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.post("/payments/import", dependencies=[Depends(get_current_user)])
+def import_payments(metodo_pago_id: int, file: UploadFile = File(...), db: Session = Depends(get_db)):
+    """Import a CSV bank statement (Nequi, Daviplata, Bancolombia...) as payments.
+
+    Rows are matched to clients by phone or reference, registered as payments
+    of metodo_pago_id and allocated FIFO like register_payment. Returns totals
+    and a per-row report.
+    """
+    if not db.query(MedioPago.id).filter(MedioPago.id == metodo_pago_id).first():
+        raise HTTPException(status_code=404, detail="Payment method not found")
+    
+    stream = io.TextIOWrapper(file.file, encoding="utf-8-sig", newline="")
+    try:
+        report, order_dates = import_statement(db, stream, metodo_pago_id)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    if report["importados"]:
+        invalidate_reports(order_dates)
+    return report
+
 @router.delete("/payments/{payment_id}", dependencies=[Depends(get_current_user)])
 def delete_payment(payment_id: int, db: Session = Depends(get_db)):
     """Delete a payment and revert its application to orders"""
     try:
-        # Get payment
-        payment = db.query(PagoRecibido).filter(PagoRecibido.id == payment_id).first()
-        if not payment:
+        deleted, order_dates = reverse_payments(db, [payment_id])
+        if not deleted:
             raise HTTPException(status_code=404, detail="Payment not found")
         
-        # Get payment-order links
-        links = db.query(PagoPedido).filter(PagoPedido.pago_id == payment_id).all()
-        
-        # Revert each order
-        for link in links:
-            order = db.query(Pedido).filter(Pedido.id == link.pedido_id).first()
-            if order:
-                order.monto_pagado = float(order.monto_pagado or 0) - float(link.monto)
-                
-                # Update order status
-                if order.monto_pagado <= 0:
-                    order.estado = 'pendiente'
-                    order.monto_pagado = 0
-                elif order.monto_pagado < order.total:
-                    order.estado = 'parcial'
-            
-            # Delete link
-            db.delete(link)
-        
-        # Delete payment
-        db.delete(payment)
         db.commit()
+        invalidate_reports(order_dates)
         
         return {"message": "Payment deleted and orders reverted"}
         
+    except HTTPException:
+        db.rollback()
+        raise
     except Exception as e:
         db.rollback()
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.post("/payments/bulk-delete", dependencies=[Depends(get_current_user)])
+def delete_payments_bulk(request: PaymentBulkDelete, db: Session = Depends(get_db)):
+    """Delete many payments (e.g. a wrongly imported statement) and revert them in one transaction"""
+    try:
+        deleted, order_dates = reverse_payments(db, request.ids)
+        db.commit()
+        if deleted:
+            invalidate_reports(order_dates)
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(status_code=500, detail=str(e))
+    
+    deleted_ids = set(deleted)
+    return {
+        "deleted": len(deleted_ids),
+        "not_found": [pago_id for pago_id in request.ids if pago_id not in deleted_ids]
+    }
+
 @router.get("/client/{client_id}/orders", dependencies=[Depends(get_current_user)])
 def get_client_pending_orders(client_id: int, db: Session = Depends(get_db)):
     """Get pending orders for a specific client"""
@@ -1,18 +1,91 @@
 from fastapi import APIRouter, Depends
 from sqlalchemy.orm import Session
-from sqlalchemy import text, func
+from sqlalchemy import func, case, and_, literal
 from typing import Optional
-from datetime import datetime
-from database import get_db
-from sql_models import Pedido, Gasto, Cliente, DetallePedido, Producto, Proveedor
+from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
+import time
+from database import get_db, SessionLocal
+from sql_models import Pedido, Gasto, Cliente, DetallePedido, Producto, Proveedor, ResumenDiario, SaldoCliente
 from utils import get_now_colombia
+from cache import dashboard_cache, summary_cache
+from client_balances import get_aging_by_client
+from ledger import get_balances
 
 router = APIRouter()
 
+# Dashboard aggregates run concurrently, each on its own pooled connection
+dashboard_executor = ThreadPoolExecutor(max_workers=3, thread_name_prefix="dashboard")
+
 @router.get("/dashboard")
-def get_dashboard_stats(db: Session = Depends(get_db)):
-    """Get dashboard statistics"""
+def get_dashboard_stats(compact: bool = False, debug: bool = False):
+    """Get dashboard statistics.
+
+    With compact=true, clientes_deudores holds one row per debtor with its debt
+    split into age buckets instead of every pending order.
+
+    The payload is cached per business date and dropped whenever orders,
+    payments, expenses or transfers are written; cache_age_seconds tells how
+    old the served snapshot is. debug=true skips the cache and adds the time
+    spent in each aggregate (timings_ms).
+    """
     today = get_now_colombia().date()
+    
+    cached = None if debug else dashboard_cache.get((today, compact))
+    if cached:
+        payload, age = cached
+        return {**payload, "cache_age_seconds": round(age, 3)}
+    
+    generation = dashboard_cache.generation()
+    payload, timings = compute_dashboard_stats(today, compact)
+    dashboard_cache.set((today, compact), payload, generation)
+    if debug:
+        return {**payload, "cache_age_seconds": 0, "timings_ms": timings}
+    return {**payload, "cache_age_seconds": 0}
+
+def compute_dashboard_stats(today, compact: bool = False):
+    """Run the dashboard aggregates for a business date in parallel.
+
+    Returns (payload, timings) where timings holds the milliseconds spent in
+    each aggregate and in total; the total approaches the slowest aggregate.
+    """
+    started = time.perf_counter()
+    futures = {
+        "totales": dashboard_executor.submit(run_timed, dashboard_totals, today),
+        "deudores": dashboard_executor.submit(run_timed, dashboard_debtors, today, compact),
+        "flujo_caja": dashboard_executor.submit(run_timed, dashboard_cash_flow)
+    }
+    results = {name: future.result() for name, future in futures.items()}
+    
+    timings = {name: round(elapsed, 2) for name, (_, elapsed) in results.items()}
+    timings["total"] = round((time.perf_counter() - started) * 1000, 2)
+    
+    ventas_mes, gastos_mes, ventas_hoy, gastos_hoy = results["totales"][0]
+    payload = {
+        "ventas_mes": float(ventas_mes),
+        "gastos_mes": float(gastos_mes),
+        "ventas_hoy": float(ventas_hoy),
+        "gastos_hoy": float(gastos_hoy),
+        "clientes_deudores": results["deudores"][0],
+        "flujo_caja": results["flujo_caja"][0]
+    }
+    return payload, timings
+
+def run_timed(task, *args):
+    """Run task(db, *args) on a session of its own; returns (result, elapsed ms)"""
+    started = time.perf_counter()
+    db = SessionLocal()
+    try:
+        return task(db, *args), (time.perf_counter() - started) * 1000
+    finally:
+        db.close()
+
+def dashboard_totals(db: Session, today):
+    """Monthly and daily sales (excluding cancelled) and expenses from the daily rollup"""
+    return [value or 0 for value in dashboard_totals_query(db, today).one()]
+
+def dashboard_totals_query(db: Session, today):
+    """(ventas_mes, gastos_mes, ventas_hoy, gastos_hoy) summed over this month's resumen_diario rows"""
     month_start = today.replace(day=1)
     
     # Calculate next month for upper bound
@@ -21,29 +94,20 @@ def get_dashboard_stats(db: Session = Depends(get_db)):
     else:
         next_month = today.replace(month=today.month + 1, day=1)
     
-    # Monthly Sales (excluding cancelled)
-    ventas_mes = db.query(func.sum(Pedido.total)).filter(
-        Pedido.fecha >= month_start,
-        Pedido.fecha < next_month,
-        Pedido.estado != 'cancelado'
-    ).scalar() or 0
-    
-    # Monthly Expenses
-    gastos_mes = db.query(func.sum(Gasto.valor)).filter(
-        Gasto.fecha >= month_start,
-        Gasto.fecha < next_month
-    ).scalar() or 0
-    
-    # Daily Sales
-    ventas_hoy = db.query(func.sum(Pedido.total)).filter(
-        func.date(Pedido.fecha) == today,
-        Pedido.estado != 'cancelado'
-    ).scalar() or 0
-    
-    # Daily Expenses
-    gastos_hoy = db.query(func.sum(Gasto.valor)).filter(
-        Gasto.fecha == today
-    ).scalar() or 0
+    return db.query(
+        func.sum(ResumenDiario.ventas),
+        func.sum(ResumenDiario.gastos),
+        func.sum(case((ResumenDiario.fecha == today, ResumenDiario.ventas), else_=0)),
+        func.sum(case((ResumenDiario.fecha == today, ResumenDiario.gastos), else_=0))
+    ).filter(
+        ResumenDiario.fecha >= month_start,
+        ResumenDiario.fecha < next_month
+    )
+
+def dashboard_debtors(db: Session, today, compact: bool = False):
+    """Debtors as aging rows per client (compact) or every open order"""
+    if compact:
+        return get_aging_by_client(db, today)
     
     # Detail of all pending orders to allow frontend to group and calculate age
     deudores_query = db.query(
@@ -57,7 +121,7 @@ def get_dashboard_stats(db: Session = Depends(get_db)):
         Pedido.estado.in_(['pendiente', 'parcial'])
     ).all()
     
-    deudores_data = [
+    return [
         {
             "id": d[0],
             "cliente_id": d[1],
@@ -67,30 +131,51 @@ def get_dashboard_stats(db: Session = Depends(get_db)):
         }
         for d in deudores_query
     ]
-    
-    # Cash Flow from view
+
+def dashboard_cash_flow(db: Session):
+    """Cash Flow from the saldos_medio_pago ledger"""
+    return [
+        {
+            "medio": row["nombre"],
+            "ingresos": row["ingresos"],
+            "egresos": row["egresos"],
+            "saldo": row["saldo"]
+        }
+        for row in get_balances(db)
+    ]
+
+@router.get("/daily-summary")
+def get_daily_summary(start_date: str, end_date: str, db: Session = Depends(get_db)):
+    """Sales, cancellations, deliveries, order count and expenses per business day"""
     try:
-        result = db.execute(text("SELECT * FROM view_saldos_medios_pago")).fetchall()
-        flujo_caja = [
-            {
-                "medio": row[1],
-                "ingresos": float(row[3]) if row[3] else 0,
-                "egresos": float(row[4]) if row[4] else 0,
-                "saldo": float(row[5]) if row[5] else 0
-            }
-            for row in result
-        ]
-    except Exception as e:
-        print(f"Error fetching cash flow: {e}")
-        flujo_caja = []
+        s_date = datetime.strptime(start_date, "%Y-%m-%d").date()
+        e_date = datetime.strptime(end_date, "%Y-%m-%d").date()
+    except ValueError:
+        return {"error": "Formato de fecha inválido. Usar YYYY-MM-DD"}
+    
+    rows = db.query(ResumenDiario).filter(
+        ResumenDiario.fecha.between(s_date, e_date)
+    ).order_by(ResumenDiario.fecha).all()
+    
+    days = [
+        {
+            "fecha": row.fecha.isoformat(),
+            "ventas": float(row.ventas),
+            "domicilios": float(row.domicilios),
+            "pedidos": row.pedidos,
+            "cancelado": float(row.cancelado),
+            "gastos": float(row.gastos)
+        }
+        for row in rows
+    ]
     
     return {
-        "ventas_mes": float(ventas_mes),
-        "gastos_mes": float(gastos_mes),
-        "ventas_hoy": float(ventas_hoy),
-        "gastos_hoy": float(gastos_hoy),
-        "clientes_deudores": deudores_data,
-        "flujo_caja": flujo_caja
+        "start_date": start_date,
+        "end_date": end_date,
+        "ventas": sum(d["ventas"] for d in days),
+        "gastos": sum(d["gastos"] for d in days),
+        "pedidos": sum(d["pedidos"] for d in days),
+        "days": days
     }
 
 @router.get("/whatsapp-summary")
@@ -101,76 +186,186 @@ def get_whatsapp_summary(date_str: Optional[str] = None, db: Session = Depends(g
     else:
         target_date = datetime.strptime(date_str, "%Y-%m-%d").date()
     
-    # Get pending orders for the target date
-    orders = db.query(Pedido).filter(
-        func.date(Pedido.fecha) == target_date,
-        Pedido.estado == 'pendiente'
-    ).all()
+    lines = pending_summary_lines(db, target_date, target_date).get(target_date)
     
-    if not orders:
+    if not lines:
         return {"text": f"*PEDIDOS {target_date}*\n\nNo hay pedidos pendientes para esta fecha."}
     
-    # Group by client
-    client_data = {}
-    client_ids = set()
+    clients, codes = summary_labels(db, lines)
+    return {"text": build_whatsapp_text(target_date, group_summary_rows(lines, clients, codes))}
+
+SUMMARY_GROUPS = {
+    "canal_venta": Cliente.canal_venta,
+    "ciudad": Cliente.ciudad
+}
+
+@router.get("/whatsapp-summary/batch")
+def get_whatsapp_summary_batch(
+    start_date: str,
+    end_date: str,
+    group_by: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
+    """WhatsApp summaries for every date in a range, optionally split by client
+    canal_venta or ciudad.
+
+    Only the order lines of each date are cached (past dates, dropped when an
+    order of that date is written); dates not cached come from a single scan
+    of their pending orders. Client names, groups, balances and product codes
+    change with writes on any date, so they are read fresh on every call.
+    """
+    try:
+        s_date = datetime.strptime(start_date, "%Y-%m-%d").date()
+        e_date = datetime.strptime(end_date, "%Y-%m-%d").date()
+    except ValueError:
+        return {"error": "Formato de fecha inválido. Usar YYYY-MM-DD"}
     
-    for order in orders:
-        cid = order.cliente_id
-        client_ids.add(cid)
-        
-        # Get client info
-        cliente = db.query(Cliente).filter(Cliente.id == cid).first()
-        if not cliente:
-            continue
-            
-        if cid not in client_data:
-            client_data[cid] = {
-                "name": cliente.nombre,
-                "items": [],
-                "total_debt": 0,
-                "show_balance": cliente.mostrar_saldo_whatsapp
-            }
-        
-        # Get order details
-        detalles = db.query(DetallePedido).filter(DetallePedido.pedido_id == order.id).all()
-        for detalle in detalles:
-            producto = db.query(Producto).filter(Producto.id == detalle.producto_id).first()
-            if producto:
-                code = producto.codigo_corto or "?"
-                client_data[cid]['items'].append(f"{detalle.cantidad} {code}")
+    if group_by is not None and group_by not in SUMMARY_GROUPS:
+        return {"error": f"group_by debe ser uno de: {', '.join(SUMMARY_GROUPS)}"}
+    if e_date < s_date or (e_date - s_date).days > 31:
+        return {"error": "El rango debe ser de máximo 31 días"}
     
-    # Calculate total pending debt for these clients
-    for cid in client_ids:
-        total_debt = db.query(func.sum(Pedido.total - Pedido.monto_pagado)).filter(
-            Pedido.cliente_id == cid,
-            Pedido.estado == 'pendiente'
-        ).scalar() or 0
-        
-        if cid in client_data:
-            client_data[cid]['total_debt'] = float(total_debt)
+    today = get_now_colombia().date()
+    dates = [s_date + timedelta(days=n) for n in range((e_date - s_date).days + 1)]
     
-    # Build WhatsApp text
-    sorted_clients = sorted(client_data.values(), key=lambda x: x['name'])
+    lines_by_day = {}
+    missing = []
+    for day in dates:
+        cached = summary_cache.get(day)
+        if cached:
+            lines_by_day[day] = cached[0]
+        else:
+            missing.append(day)
     
-    summary_text = f"*PEDIDOS {target_date}*\n\n"
+    if missing:
+        generation = summary_cache.generation()
+        fetched = pending_summary_lines(db, missing[0], missing[-1])
+        for day in missing:
+            lines_by_day[day] = fetched.get(day, [])
+            if day < today:
+                summary_cache.set(day, lines_by_day[day], generation)
     
-    for client in sorted_clients:
-        name = client['name']
-        debt = client['total_debt']
-        items = client['items']
-        show_balance = client['show_balance']
-        
-        if show_balance:
-            summary_text += f"*{name}* ${debt:,.0f}\n"
+    clients, codes = summary_labels(
+        db, [line for day in dates for line in lines_by_day[day]], group_by
+    )
+    
+    summaries = {}
+    for day in dates:
+        # Split lines by group; group_summary_rows restores the client ordering
+        buckets = {}
+        for line in lines_by_day[day]:
+            group = (clients[line[0]]["group"] or "sin_definir") if group_by else "todos"
+            buckets.setdefault(group, []).append(line)
+        summaries[day] = {
+            group: build_whatsapp_text(
+                day,
+                group_summary_rows(group_lines, clients, codes),
+                label=group if group_by else None
+            )
+            for group, group_lines in buckets.items()
+        }
+    
+    return {
+        "start_date": start_date,
+        "end_date": end_date,
+        "group_by": group_by,
+        "summaries": {day.isoformat(): summaries[day] for day in dates}
+    }
+
+def summary_lines_query(db: Session):
+    """One row per pending order line (or per order without lines), with ids
+    only: labels and balances come from summary_labels"""
+    return db.query(
+        Pedido.fecha_local,
+        Pedido.cliente_id,
+        Pedido.id.label('pedido_id'),
+        DetallePedido.id.label('detalle_id'),
+        DetallePedido.producto_id,
+        DetallePedido.cantidad
+    ).outerjoin(
+        DetallePedido, DetallePedido.pedido_id == Pedido.id
+    ).filter(Pedido.estado == 'pendiente')
+
+def pending_summary_lines(db: Session, start, end):
+    """Pending order lines per business date, as
+    (cliente_id, pedido_id, detalle_id, producto_id, cantidad) tuples"""
+    lines = {}
+    for row in summary_lines_query(db).filter(Pedido.fecha_local.between(start, end)):
+        lines.setdefault(row.fecha_local, []).append(
+            (row.cliente_id, row.pedido_id, row.detalle_id, row.producto_id, row.cantidad)
+        )
+    return lines
+
+def summary_labels(db: Session, lines, group_by: Optional[str] = None):
+    """Current name, balance, group and list position of every client in lines
+    (one grouped query), plus the codigo_corto of their products"""
+    client_ids = {line[0] for line in lines}
+    product_ids = {line[3] for line in lines if line[3] is not None}
+    clients = {}
+    codes = {}
+    if client_ids:
+        group = SUMMARY_GROUPS[group_by] if group_by else literal(None)
+        rows = db.query(
+            Cliente.id,
+            Cliente.nombre,
+            Cliente.mostrar_saldo_whatsapp,
+            group.label('grupo'),
+            func.sum(Pedido.total - Pedido.monto_pagado).label('deuda')
+        ).outerjoin(
+            Pedido, and_(Pedido.cliente_id == Cliente.id, Pedido.estado == 'pendiente')
+        ).filter(
+            Cliente.id.in_(client_ids)
+        ).group_by(Cliente.id).order_by(Cliente.nombre, Cliente.id).all()
+        for position, row in enumerate(rows):
+            clients[row.id] = {
+                "position": position,
+                "name": row.nombre,
+                "total_debt": float(row.deuda or 0),
+                "show_balance": row.mostrar_saldo_whatsapp,
+                "group": row.grupo
+            }
+    if product_ids:
+        codes = dict(
+            db.query(Producto.id, Producto.codigo_corto).filter(Producto.id.in_(product_ids)).all()
+        )
+    return clients, codes
+
+def group_summary_rows(lines, clients, codes):
+    """Collapse summary lines into one entry per client, ordered by client name
+    and then by order and line id"""
+    client_data = {}
+    ordered = sorted(
+        (line for line in lines if line[0] in clients),
+        key=lambda line: (clients[line[0]]["position"], line[1], line[2] or 0)
+    )
+    for cliente_id, _pedido_id, _detalle_id, producto_id, cantidad in ordered:
+        client = client_data.get(cliente_id)
+        if client is None:
+            label = clients[cliente_id]
+            client = client_data[cliente_id] = {
+                "name": label["name"],
+                "items": [],
+                "total_debt": label["total_debt"],
+                "show_balance": label["show_balance"]
+            }
+        if producto_id is not None:
+            client["items"].append(f"{cantidad} {codes.get(producto_id) or '?'}")
+    return list(client_data.values())
+
+def build_whatsapp_text(target_date, clients, label: Optional[str] = None):
+    """Assemble the WhatsApp message for a list of grouped clients"""
+    title = f"*PEDIDOS {target_date} - {label.upper()}*" if label else f"*PEDIDOS {target_date}*"
+    lines = [title, ""]
+    
+    for client in clients:
+        if client['show_balance']:
+            lines.append(f"*{client['name']}* ${client['total_debt']:,.0f}")
         else:
-            summary_text += f"*{name}*\n"
-        
-        for item_str in items:
-            summary_text += f"{item_str}\n"
-        
-        summary_text += "\n"
+            lines.append(f"*{client['name']}*")
+        lines.extend(client['items'])
+        lines.append("")
     
-    return {"text": summary_text.strip()}
+    return "\n".join(lines).strip()
 
 @router.get("/client-report")
 def get_client_report(client_id: int, start_date: str, end_date: str, db: Session = Depends(get_db)):
@@ -181,11 +376,7 @@ def get_client_report(client_id: int, start_date: str, end_date: str, db: Sessio
     if not cliente:
         return {"error": "Cliente no encontrado"}
 
-    orders = db.query(Pedido).filter(
-        Pedido.cliente_id == client_id,
-        func.date(Pedido.fecha).between(s_date, e_date),
-        Pedido.estado != 'cancelado'
-    ).order_by(Pedido.fecha.asc()).all()
+    orders = client_report_orders_query(db, client_id, s_date, e_date).all()
 
     period_orders = []
     period_total = 0
@@ -207,10 +398,7 @@ def get_client_report(client_id: int, start_date: str, end_date: str, db: Sessio
             "items": items
         })
 
-    pending_debt = db.query(func.sum(Pedido.total - Pedido.monto_pagado)).filter(
-        Pedido.cliente_id == client_id,
-        Pedido.estado.in_(['pendiente', 'parcial'])
-    ).scalar() or 0
+    pending_debt = db.query(SaldoCliente.deuda).filter(SaldoCliente.cliente_id == client_id).scalar() or 0
 
     return {
         "client_name": cliente.nombre,
@@ -221,6 +409,14 @@ def get_client_report(client_id: int, start_date: str, end_date: str, db: Sessio
         "orders": period_orders
     }
 
+def client_report_orders_query(db: Session, client_id: int, s_date, e_date):
+    """The client's non-cancelled orders between two business dates, oldest first"""
+    return db.query(Pedido).filter(
+        Pedido.cliente_id == client_id,
+        Pedido.fecha_local.between(s_date, e_date),
+        Pedido.estado != 'cancelado'
+    ).order_by(Pedido.fecha.asc())
+
 @router.get("/vendor-report")
 def get_vendor_report(vendor_id: int, start_date: str, end_date: str, db: Session = Depends(get_db)):
     """Generate report for specific vendor"""
@@ -234,10 +430,7 @@ def get_vendor_report(vendor_id: int, start_date: str, end_date: str, db: Sessio
     if not proveedor:
         return {"error": "Proveedor no encontrado"}
 
-    gastos = db.query(Gasto).filter(
-        Gasto.proveedor_id == vendor_id,
-        Gasto.fecha.between(s_date, e_date)
-    ).order_by(Gasto.fecha.asc()).all()
+    gastos = vendor_report_expenses_query(db, vendor_id, s_date, e_date).all()
 
     period_expenses = []
     period_total = 0
@@ -266,3 +459,10 @@ def get_vendor_report(vendor_id: int, start_date: str, end_date: str, db: Sessio
         "expenses": period_expenses,
         "total_pending_debt": 0
     }
+
+def vendor_report_expenses_query(db: Session, vendor_id: int, s_date, e_date):
+    """The supplier's expenses between two dates, oldest first"""
+    return db.query(Gasto).filter(
+        Gasto.proveedor_id == vendor_id,
+        Gasto.fecha.between(s_date, e_date)
+    ).order_by(Gasto.fecha.asc())
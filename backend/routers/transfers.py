@@ -1,18 +1,19 @@
 from fastapi import APIRouter, HTTPException, status, Depends
 from sqlalchemy.orm import Session
-from sqlalchemy import text
-from typing import List
+from typing import List, Optional
 from database import get_db
 from sql_models import Transferencia, MedioPago
 from models import Transfer, TransferCreate
-from utils import get_now_colombia
+from utils import get_now_colombia, parse_local_date
+from cache import invalidate_reports
+from ledger import BalanceDeltas, apply_balance_deltas, get_balances as get_method_balances, get_movements
 
 router = APIRouter(tags=["transfers"])
 
 @router.get("/", response_model=List[Transfer])
 def get_transfers(db: Session = Depends(get_db)):
     """Get all transfers with payment method names"""
-    transfers = db.query(Transferencia).order_by(Transferencia.fecha.desc()).all()
+    transfers = transfers_query(db).all()
     
     if not transfers:
         return []
@@ -40,6 +41,10 @@ def get_transfers(db: Session = Depends(get_db)):
     
     return result
 
+def transfers_query(db: Session):
+    """All transfers, newest first"""
+    return db.query(Transferencia).order_by(Transferencia.fecha.desc())
+
 @router.post("/", response_model=Transfer)
 def create_transfer(transfer: TransferCreate, db: Session = Depends(get_db)):
     """Create a new transfer"""
@@ -50,7 +55,13 @@ def create_transfer(transfer: TransferCreate, db: Session = Depends(get_db)):
         
         db_transfer = Transferencia(**transfer_data)
         db.add(db_transfer)
+        
+        balances = BalanceDeltas()
+        balances.add_transfer(db_transfer.origen_id, db_transfer.destino_id, db_transfer.fecha, db_transfer.valor)
+        apply_balance_deltas(db, balances)
+        
         db.commit()
+        invalidate_reports()
         db.refresh(db_transfer)
         
         # Add method names for response
@@ -81,10 +92,17 @@ def update_transfer(id: int, transfer: TransferCreate, db: Session = Depends(get
     if not db_transfer:
         raise HTTPException(status_code=404, detail="Transfer not found")
     
+    balances = BalanceDeltas()
+    balances.add_transfer(db_transfer.origen_id, db_transfer.destino_id, db_transfer.fecha, db_transfer.valor, sign=-1)
+    
     for key, value in transfer.dict(exclude_unset=True).items():
         setattr(db_transfer, key, value)
     
+    balances.add_transfer(db_transfer.origen_id, db_transfer.destino_id, db_transfer.fecha, db_transfer.valor)
+    apply_balance_deltas(db, balances)
+    
     db.commit()
+    invalidate_reports()
     db.refresh(db_transfer)
     
     # Add method names for response
@@ -112,29 +130,44 @@ def delete_transfer(id: int, db: Session = Depends(get_db)):
     if not db_transfer:
         raise HTTPException(status_code=404, detail="Transfer not found")
     
+    balances = BalanceDeltas()
+    balances.add_transfer(db_transfer.origen_id, db_transfer.destino_id, db_transfer.fecha, db_transfer.valor, sign=-1)
+    apply_balance_deltas(db, balances)
+    
     db.delete(db_transfer)
     db.commit()
+    invalidate_reports()
     return {"message": "Transfer deleted successfully"}
 
 @router.get("/balances")
-def get_balances(db: Session = Depends(get_db)):
-    """Get balances from view_saldos_medios_pago"""
+def get_balances(as_of: Optional[str] = None, db: Session = Depends(get_db)):
+    """Get the balance of each active payment method, current or at the end of the as_of date"""
+    if as_of:
+        try:
+            as_of_date = parse_local_date(as_of)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid date format. Use YYYY-MM-DD")
+        return get_method_balances(db, as_of=as_of_date)
+    return get_method_balances(db)
+
+@router.get("/balances/{medio_pago_id}/movements")
+def get_balance_movements(
+    medio_pago_id: int,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
+    """Movement ledger of one payment method with a running balance (defaults to the current month)"""
+    if not db.query(MedioPago.id).filter(MedioPago.id == medio_pago_id).first():
+        raise HTTPException(status_code=404, detail="Payment method not found")
+    
+    today = get_now_colombia().date()
     try:
-        # Query the view directly
-        result = db.execute(text("SELECT * FROM view_saldos_medios_pago")).fetchall()
-        
-        # Convert to list of dicts
-        balances = []
-        for row in result:
-            balances.append({
-                "id": row[0],
-                "nombre": row[1],
-                "tipo": row[2],
-                "ingresos": float(row[3]) if row[3] else 0,
-                "egresos": float(row[4]) if row[4] else 0,
-                "saldo": float(row[5]) if row[5] else 0
-            })
-        return balances
-    except Exception as e:
-        print(f"Error fetching balances: {e}")
-        return []
+        start = parse_local_date(start_date) if start_date else today.replace(day=1)
+        end = parse_local_date(end_date) if end_date else today
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid date format. Use YYYY-MM-DD")
+    if start > end:
+        raise HTTPException(status_code=400, detail="start_date must be before end_date")
+    
+    return get_movements(db, medio_pago_id, start, end)
@@ -0,0 +1,226 @@
+# Auditoría de consistencia de cartera (pedidos, pagos y sus asignaciones)
+# Ejecutar desde backend/: python scripts/audit_receivables.py [--repair] [--workers N] [--chunk N]
+#
+# Verifica, por bloques de ids (keyset) repartidos en varios procesos:
+#   - pedidos.monto_pagado = SUM(pagos_pedidos.monto) del pedido
+#   - estado coherente con lo pagado (pendiente / parcial / pagado; lo
+#     cancelado no se revisa y 'pagado' sin abonos se acepta: pago de contado)
+#   - ningún pedido recibe más de su total
+#   - cada pago está asignado por completo o deja un saldo a favor conocido,
+#     y nunca tiene asignado más que su monto
+# Nunca carga las tablas completas en memoria: cada proceso agrega su bloque
+# en SQL y devuelve conteos y algunos ejemplos.
+# Con --repair recalcula monto_pagado y estado de los pedidos con diferencias
+# (y saldo_cliente de sus clientes). Sobrepagos y pagos sobreasignados solo se
+# informan: requieren revisión manual.
+
+import sys
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sqlalchemy import text
+from database import engine, SessionLocal
+from client_balances import lock_client, refresh_client_balances
+
+CHUNK_SIZE = 10000
+EJEMPLOS_POR_BLOQUE = 5
+
+# Estado esperado según lo asignado (l.pagado); mismas reglas que allocation.py
+ESTADO_ESPERADO = """
+    CASE WHEN p.estado = 'cancelado' THEN p.estado
+         WHEN COALESCE(l.pagado, 0) >= p.total THEN 'pagado'
+         WHEN COALESCE(l.pagado, 0) > 0 THEN 'parcial'
+         WHEN p.estado = 'pagado' THEN 'pagado'
+         ELSE 'pendiente'
+    END
+"""
+
+PEDIDOS_SQL = f"""
+    SELECT p.id, p.cliente_id, p.total, COALESCE(p.monto_pagado, 0) AS monto_pagado,
+           COALESCE(l.pagado, 0) AS pagado, p.estado, {ESTADO_ESPERADO} AS estado_esperado
+    FROM pedidos p
+    LEFT JOIN (
+        SELECT pedido_id, SUM(monto) AS pagado
+        FROM pagos_pedidos
+        WHERE pedido_id > :desde AND pedido_id <= :hasta
+        GROUP BY pedido_id
+    ) l ON l.pedido_id = p.id
+    WHERE p.id > :desde AND p.id <= :hasta
+      AND (COALESCE(p.monto_pagado, 0) <> COALESCE(l.pagado, 0)
+           OR p.estado IS DISTINCT FROM {ESTADO_ESPERADO}
+           OR COALESCE(l.pagado, 0) > p.total)
+    ORDER BY p.id
+"""
+
+REPARAR_PEDIDOS_SQL = f"""
+    UPDATE pedidos p
+    SET monto_pagado = COALESCE(l.pagado, 0),
+        estado = {ESTADO_ESPERADO}
+    FROM (
+        SELECT p2.id, SUM(pp.monto) AS pagado
+        FROM pedidos p2
+        LEFT JOIN pagos_pedidos pp ON pp.pedido_id = p2.id
+        WHERE p2.id > :desde AND p2.id <= :hasta
+        GROUP BY p2.id
+    ) l
+    WHERE l.id = p.id
+      AND p.cliente_id = ANY(:clientes)
+      AND COALESCE(l.pagado, 0) <= p.total
+      AND (COALESCE(p.monto_pagado, 0) <> COALESCE(l.pagado, 0)
+           OR p.estado IS DISTINCT FROM {ESTADO_ESPERADO})
+    RETURNING p.id
+"""
+
+PAGOS_SQL = """
+    SELECT r.id, r.monto, COALESCE(SUM(pp.monto), 0) AS asignado
+    FROM pagos_recibidos r
+    LEFT JOIN pagos_pedidos pp ON pp.pago_id = r.id
+    WHERE r.id > :desde AND r.id <= :hasta
+    GROUP BY r.id, r.monto
+    HAVING COALESCE(SUM(pp.monto), 0) <> r.monto
+    ORDER BY r.id
+"""
+
+def bloques(tabla, chunk_size):
+    """Límites (desde, hasta] de bloques de chunk_size ids, recorriendo la PK sin cargarla"""
+    desde = 0
+    with engine.connect() as conn:
+        while True:
+            hasta = conn.execute(
+                text(f"SELECT id FROM {tabla} WHERE id > :desde ORDER BY id OFFSET :n LIMIT 1"),
+                {"desde": desde, "n": chunk_size - 1}
+            ).scalar()
+            if hasta is None:
+                hasta = conn.execute(text(f"SELECT MAX(id) FROM {tabla} WHERE id > :desde"), {"desde": desde}).scalar()
+                if hasta is not None:
+                    yield desde, hasta
+                return
+            yield desde, hasta
+            desde = hasta
+
+def iniciar_proceso():
+    # Cada proceso abre sus propias conexiones; las heredadas del padre no se comparten
+    engine.dispose(close=False)
+
+def contar(tabla, desde, hasta, conn):
+    return conn.execute(
+        text(f"SELECT COUNT(*) FROM {tabla} WHERE id > :desde AND id <= :hasta"),
+        {"desde": desde, "hasta": hasta}
+    ).scalar()
+
+def auditar_pedidos(desde, hasta, reparar):
+    """Revisa un bloque de pedidos; devuelve (filas, conteos, ejemplos, reparados)"""
+    conteos = {"monto_pagado": 0, "estado": 0, "sobrepago": 0}
+    ejemplos = []
+    reparados = 0
+    params = {"desde": desde, "hasta": hasta}
+
+    db = SessionLocal()
+    try:
+        filas = contar("pedidos", desde, hasta, db)
+        clientes = set()
+        for row in db.execute(text(PEDIDOS_SQL), params):
+            if row.pagado > row.total:
+                conteos["sobrepago"] += 1
+                problema = "sobrepago"
+            elif row.monto_pagado != row.pagado:
+                conteos["monto_pagado"] += 1
+                problema = "monto_pagado"
+                clientes.add(row.cliente_id)
+            else:
+                conteos["estado"] += 1
+                problema = "estado"
+                clientes.add(row.cliente_id)
+            if len(ejemplos) < EJEMPLOS_POR_BLOQUE:
+                ejemplos.append(
+                    f"pedido #{row.id} ({problema}): total {row.total}, monto_pagado {row.monto_pagado}, "
+                    f"asignado {row.pagado}, estado {row.estado} -> {row.estado_esperado}"
+                )
+
+        if reparar and clientes:
+            # Mismos bloqueos que la API, en una sola pasada por id, para no
+            # cruzarse con un abono en curso. El UPDATE solo toca pedidos de
+            # esos clientes, así refresh_client_balances no bloquea ninguno nuevo.
+            clientes = sorted(clientes)
+            for cliente_id in clientes:
+                lock_client(db, cliente_id)
+            afectados = db.execute(text(REPARAR_PEDIDOS_SQL), {**params, "clientes": clientes}).fetchall()
+            reparados = len(afectados)
+            refresh_client_balances(db, clientes)
+            db.commit()
+    finally:
+        db.close()
+    return filas, conteos, ejemplos, reparados
+
+def auditar_pagos(desde, hasta, reparar):
+    """Revisa un bloque de pagos; devuelve (filas, conteos, ejemplos, saldo a favor)"""
+    conteos = {"sobreasignado": 0, "con_saldo": 0}
+    ejemplos = []
+    saldo_a_favor = 0
+
+    with engine.connect() as conn:
+        filas = contar("pagos_recibidos", desde, hasta, conn)
+        for row in conn.execute(text(PAGOS_SQL), {"desde": desde, "hasta": hasta}):
+            if row.asignado > row.monto:
+                conteos["sobreasignado"] += 1
+                if len(ejemplos) < EJEMPLOS_POR_BLOQUE:
+                    ejemplos.append(f"pago #{row.id}: monto {row.monto}, asignado {row.asignado}")
+            else:
+                conteos["con_saldo"] += 1
+                saldo_a_favor += float(row.monto - row.asignado)
+    return filas, conteos, ejemplos, saldo_a_favor
+
+def ejecutar(nombre, tabla, tarea, workers, chunk_size, reparar):
+    inicio = time.perf_counter()
+    filas = 0
+    totales = {}
+    ejemplos = []
+    extra = 0
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=iniciar_proceso) as pool:
+        futuros = [pool.submit(tarea, desde, hasta, reparar) for desde, hasta in bloques(tabla, chunk_size)]
+        for futuro in futuros:
+            n, conteos, muestra, valor = futuro.result()
+            filas += n
+            extra += valor
+            for clave, cantidad in conteos.items():
+                totales[clave] = totales.get(clave, 0) + cantidad
+            ejemplos.extend(muestra)
+
+    segundos = time.perf_counter() - inicio
+    print(f"\n{nombre}: {filas} fila(s) en {len(futuros)} bloque(s), {segundos:.1f}s ({filas / segundos if segundos else 0:,.0f} filas/s)")
+    for clave, cantidad in totales.items():
+        print(f"   {clave}: {cantidad}")
+    for ejemplo in ejemplos[:20]:
+        print(f"   - {ejemplo}")
+    if len(ejemplos) > 20:
+        print(f"   ... y {len(ejemplos) - 20} ejemplo(s) más")
+    return totales, extra
+
+def main():
+    reparar = '--repair' in sys.argv
+    workers = int(sys.argv[sys.argv.index('--workers') + 1]) if '--workers' in sys.argv else os.cpu_count()
+    chunk_size = int(sys.argv[sys.argv.index('--chunk') + 1]) if '--chunk' in sys.argv else CHUNK_SIZE
+
+    print(f"Auditoría de cartera ({workers} proceso(s), bloques de {chunk_size}{', con reparación' if reparar else ''})")
+
+    pedidos, reparados = ejecutar("Pedidos", "pedidos", auditar_pedidos, workers, chunk_size, reparar)
+    pagos, saldo_a_favor = ejecutar("Pagos", "pagos_recibidos", auditar_pagos, workers, chunk_size, reparar)
+    print(f"   saldo a favor sin asignar: ${saldo_a_favor:,.2f}")
+
+    if reparar and reparados:
+        print(f"\n[OK] {reparados} pedido(s) reparados")
+
+    pendientes = pedidos.get("sobrepago", 0) + pagos.get("sobreasignado", 0)
+    if not reparar:
+        pendientes += pedidos.get("monto_pagado", 0) + pedidos.get("estado", 0)
+    if pendientes:
+        print(f"\n[ERROR] {pendientes} inconsistencia(s) por revisar")
+        sys.exit(1)
+    print("\n[OK] Cartera consistente")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+# Mide el tiempo de generación del resumen de WhatsApp (reports.get_whatsapp_summary)
+# Ejecutar desde backend/: python scripts/bench_whatsapp_summary.py [--pedidos 500] [--clientes 80] [--repeticiones 20]
+#
+# Crea un día sintético (clientes, productos y pedidos pendientes de 3 líneas)
+# dentro de una transacción que se deshace al final, genera el resumen varias
+# veces con la misma sesión y compara la mediana con el objetivo de 50 ms.
+# No deja datos en la base. Termina con código 1 si se supera el objetivo.
+
+import sys
+import os
+import time
+import statistics
+from datetime import date, datetime, time as dtime
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sqlalchemy import insert
+from database import SessionLocal
+from sql_models import Cliente, Producto, Pedido, DetallePedido
+from routers.reports import get_whatsapp_summary
+from utils import COLOMBIA_TZ
+
+OBJETIVO_MS = 50
+LINEAS_POR_PEDIDO = 3
+# Día sin pedidos reales, para que el resumen solo vea los datos sintéticos
+DIA = date(2099, 1, 1)
+
+def argumento(nombre, defecto):
+    return int(sys.argv[sys.argv.index(nombre) + 1]) if nombre in sys.argv else defecto
+
+def sembrar(db, n_pedidos, n_clientes):
+    clientes = db.scalars(
+        insert(Cliente).returning(Cliente.id, sort_by_parameter_order=True),
+        [{"nombre": f"Bench {i:03d}", "tipo_cliente": "local", "mostrar_saldo_whatsapp": True} for i in range(n_clientes)]
+    ).all()
+    productos = db.scalars(
+        insert(Producto).returning(Producto.id, sort_by_parameter_order=True),
+        [{"nombre": f"Bench {i}", "codigo_corto": f"BENCH{i}", "precio_estandar": 1000} for i in range(LINEAS_POR_PEDIDO)]
+    ).all()
+    fecha = datetime.combine(DIA, dtime(9), tzinfo=COLOMBIA_TZ)
+    pedidos = db.scalars(
+        insert(Pedido).returning(Pedido.id, sort_by_parameter_order=True),
+        [{"cliente_id": clientes[i % n_clientes], "fecha": fecha, "total": 1000 * LINEAS_POR_PEDIDO,
+          "monto_pagado": 0, "estado": "pendiente"} for i in range(n_pedidos)]
+    ).all()
+    db.execute(insert(DetallePedido), [
+        {"pedido_id": pedido_id, "producto_id": producto_id, "cantidad": 1, "precio_aplicado": 1000, "subtotal": 1000}
+        for pedido_id in pedidos
+        for producto_id in productos
+    ])
+    db.flush()
+
+def main():
+    n_pedidos = argumento('--pedidos', 500)
+    n_clientes = argumento('--clientes', 80)
+    repeticiones = argumento('--repeticiones', 20)
+
+    db = SessionLocal()
+    try:
+        sembrar(db, n_pedidos, n_clientes)
+        get_whatsapp_summary(DIA.isoformat(), db) # calentamiento (planes y caché de la base)
+
+        tiempos = []
+        for _ in range(repeticiones):
+            inicio = time.perf_counter()
+            get_whatsapp_summary(DIA.isoformat(), db)
+            tiempos.append((time.perf_counter() - inicio) * 1000)
+    finally:
+        db.rollback()
+        db.close()
+
+    mediana = statistics.median(tiempos)
+    print(f"Resumen de {n_pedidos} pedidos ({n_pedidos * LINEAS_POR_PEDIDO} líneas, {n_clientes} clientes), {repeticiones} repeticiones:")
+    print(f"   mín {min(tiempos):.1f} ms, mediana {mediana:.1f} ms, máx {max(tiempos):.1f} ms")
+    if mediana > OBJETIVO_MS:
+        print(f"[ERROR] La mediana supera el objetivo de {OBJETIVO_MS} ms")
+        sys.exit(1)
+    print(f"[OK] Dentro del objetivo de {OBJETIVO_MS} ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+# Genera los cierres diarios de saldo por medio de pago (tabla cierres_medio_pago)
+# Ejecutar desde backend/ una vez al día: python scripts/cierre_medios_pago.py [--hasta YYYY-MM-DD] [--rebuild]
+#
+# Crea un cierre por día y medio de pago desde el último cierre existente hasta
+# ayer (o --hasta). Sin cierres previos empieza en el primer movimiento.
+# Con --rebuild borra todos los cierres y los recalcula desde el principio.
+# Los movimientos con fecha pasada registrados después del cierre los ajusta
+# la API (ledger.apply_balance_deltas), no hace falta volver a ejecutarlo.
+
+import sys
+import os
+from datetime import timedelta
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sqlalchemy import text
+from database import engine
+from utils import get_now_colombia, parse_local_date, local_date_range
+
+PRIMER_MOVIMIENTO_SQL = """
+    SELECT LEAST(
+        (SELECT MIN((fecha AT TIME ZONE 'America/Bogota')::date) FROM pagos_recibidos WHERE metodo_pago_id IS NOT NULL),
+        (SELECT MIN(fecha) FROM gastos WHERE medio_pago_id IS NOT NULL),
+        (SELECT MIN(fecha) FROM transferencias)
+    )
+"""
+
+# Saldo acumulado al final de cada día = cierre anterior + movimientos hasta ese día
+CIERRES_SQL = """
+    WITH movimientos AS (
+        SELECT medio_pago_id, dia, SUM(ingresos) AS ingresos, SUM(egresos) AS egresos
+        FROM (
+            SELECT metodo_pago_id AS medio_pago_id, (fecha AT TIME ZONE 'America/Bogota')::date AS dia,
+                   monto AS ingresos, 0 AS egresos
+            FROM pagos_recibidos
+            WHERE metodo_pago_id IS NOT NULL AND fecha >= :desde_ts AND fecha < :hasta_ts
+            UNION ALL
+            SELECT medio_pago_id, fecha, 0, valor FROM gastos
+            WHERE medio_pago_id IS NOT NULL AND fecha BETWEEN :desde AND :hasta
+            UNION ALL
+            SELECT destino_id, fecha, valor, 0 FROM transferencias
+            WHERE destino_id IS NOT NULL AND fecha BETWEEN :desde AND :hasta
+            UNION ALL
+            SELECT origen_id, fecha, 0, valor FROM transferencias
+            WHERE origen_id IS NOT NULL AND fecha BETWEEN :desde AND :hasta
+        ) m
+        GROUP BY medio_pago_id, dia
+    ),
+    dias AS (
+        SELECT generate_series(CAST(:desde AS date), CAST(:hasta AS date), interval '1 day')::date AS dia
+    ),
+    base AS (
+        SELECT medio_pago_id, ingresos, egresos
+        FROM cierres_medio_pago
+        WHERE fecha = CAST(:desde AS date) - 1
+    )
+    INSERT INTO cierres_medio_pago (fecha, medio_pago_id, ingresos, egresos)
+    SELECT d.dia, mp.id,
+           COALESCE(b.ingresos, 0) + SUM(COALESCE(m.ingresos, 0)) OVER w,
+           COALESCE(b.egresos, 0) + SUM(COALESCE(m.egresos, 0)) OVER w
+    FROM dias d
+    CROSS JOIN medios_pago mp
+    LEFT JOIN base b ON b.medio_pago_id = mp.id
+    LEFT JOIN movimientos m ON m.medio_pago_id = mp.id AND m.dia = d.dia
+    WINDOW w AS (PARTITION BY mp.id ORDER BY d.dia)
+"""
+
+def generar_cierres(hasta, rebuild=False):
+    with engine.begin() as conn:
+        # Bloquea a los escritores de saldos mientras se calcula el cierre para
+        # que ningún movimiento quede fuera o se cuente dos veces
+        conn.execute(text("LOCK TABLE saldos_medio_pago IN SHARE ROW EXCLUSIVE MODE"))
+        conn.execute(text("LOCK TABLE cierres_medio_pago IN EXCLUSIVE MODE"))
+        if rebuild:
+            conn.execute(text("DELETE FROM cierres_medio_pago"))
+
+        ultimo = conn.execute(text("SELECT MAX(fecha) FROM cierres_medio_pago")).scalar()
+        desde = ultimo + timedelta(days=1) if ultimo else conn.execute(text(PRIMER_MOVIMIENTO_SQL)).scalar()
+
+        if desde is None or desde > hasta:
+            print(f"[OK] Cierres al día (último: {ultimo})")
+            return
+
+        desde_ts, hasta_ts = local_date_range(desde, hasta)
+        result = conn.execute(text(CIERRES_SQL), {
+            "desde": desde,
+            "hasta": hasta,
+            "desde_ts": desde_ts,
+            "hasta_ts": hasta_ts
+        })
+    print(f"[OK] Cierres generados del {desde} al {hasta}: {result.rowcount} fila(s)")
+
+if __name__ == "__main__":
+    hasta = get_now_colombia().date() - timedelta(days=1)
+    if '--hasta' in sys.argv:
+        hasta = parse_local_date(sys.argv[sys.argv.index('--hasta') + 1])
+    generar_cierres(hasta, rebuild='--rebuild' in sys.argv)
@@ -0,0 +1,54 @@
+# Importa un extracto bancario CSV como pagos recibidos
+# Ejecutar desde backend/: python scripts/importar_extracto.py extracto.csv --medio <medio_pago_id> [--reporte reporte.csv]
+#
+# Columnas del CSV: fecha y monto (obligatorias), referencia, telefono y
+# descripcion (opcionales). Cada fila se asocia a un cliente por teléfono o
+# referencia y el pago se aplica a sus pedidos pendientes (FIFO) con la misma
+# lógica que POST /api/receivables/payments. Volver a importar el mismo
+# extracto no duplica los pagos.
+# El caché del dashboard vive en el proceso de la API: reinícialo (o registra
+# cualquier pago desde la app) para ver los saldos nuevos en el panel.
+
+import sys
+import os
+import csv
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from database import SessionLocal
+from payment_import import import_statement
+
+def main():
+    if len(sys.argv) < 2 or '--medio' not in sys.argv:
+        print("Uso: python scripts/importar_extracto.py extracto.csv --medio <medio_pago_id> [--reporte reporte.csv]")
+        sys.exit(1)
+
+    archivo = sys.argv[1]
+    medio_pago_id = int(sys.argv[sys.argv.index('--medio') + 1])
+    reporte = sys.argv[sys.argv.index('--reporte') + 1] if '--reporte' in sys.argv else None
+
+    db = SessionLocal()
+    try:
+        with open(archivo, encoding="utf-8-sig", newline="") as f:
+            resultado, _ = import_statement(db, f, medio_pago_id)
+    finally:
+        db.close()
+
+    print(f"[OK] {resultado['filas']} fila(s) procesadas")
+    print(f"   Importados:  {resultado['importados']} (${resultado['total_importado']:,.0f}, aplicado ${resultado['total_aplicado']:,.0f})")
+    print(f"   Duplicados:  {resultado['duplicados']}")
+    print(f"   Sin cliente: {resultado['sin_cliente']}")
+    print(f"   Inválidos:   {resultado['invalidos']}")
+    print(f"   Ignorados:   {resultado['ignorados']}")
+    if resultado['errores']:
+        print(f"[ERROR] {resultado['errores']} fila(s) con error")
+
+    if reporte:
+        with open(reporte, "w", encoding="utf-8", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=list(resultado["detalle"][0].keys()) if resultado["detalle"] else ["fila"])
+            writer.writeheader()
+            writer.writerows(resultado["detalle"])
+        print(f"Reporte por fila guardado en {reporte}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+# Aplica las migraciones versionadas de database/migrations en orden
+# Ejecutar desde backend/: python scripts/migrate.py [--list]
+#
+# Cada archivo NNN_descripcion.sql se aplica una sola vez, dentro de su propia
+# transacción, y queda registrado en la tabla schema_migrations.
+
+import sys
+import os
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, BACKEND_DIR)
+
+from sqlalchemy import text
+from database import engine
+
+MIGRATIONS_DIR = os.path.join(BACKEND_DIR, '..', 'database', 'migrations')
+
+def get_migration_files():
+    """Archivos de migración ordenados por versión"""
+    files = sorted(f for f in os.listdir(MIGRATIONS_DIR) if f.endswith('.sql'))
+    return [(f.split('_', 1)[0], f) for f in files]
+
+def get_applied_versions(conn):
+    conn.execute(text("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version TEXT PRIMARY KEY,
+            nombre TEXT NOT NULL,
+            applied_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+        )
+    """))
+    return {row[0] for row in conn.execute(text("SELECT version FROM schema_migrations"))}
+
+def migrate(list_only=False):
+    with engine.begin() as conn:
+        applied = get_applied_versions(conn)
+
+    pending = [(v, f) for v, f in get_migration_files() if v not in applied]
+
+    if list_only:
+        for version, filename in get_migration_files():
+            estado = "aplicada" if version in applied else "pendiente"
+            print(f"  [{estado}] {filename}")
+        return
+
+    if not pending:
+        print("[OK] La base de datos está al día")
+        return
+
+    for version, filename in pending:
+        with open(os.path.join(MIGRATIONS_DIR, filename), encoding='utf-8') as f:
+            sql = f.read()
+
+        print(f"Aplicando {filename}...")
+        with engine.begin() as conn:
+            conn.exec_driver_sql(sql)
+            conn.execute(
+                text("INSERT INTO schema_migrations (version, nombre) VALUES (:version, :nombre)"),
+                {"version": version, "nombre": filename}
+            )
+
+    print(f"[OK] {len(pending)} migración(es) aplicada(s)")
+
+if __name__ == "__main__":
+    migrate(list_only='--list' in sys.argv)
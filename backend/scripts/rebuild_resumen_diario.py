@@ -0,0 +1,83 @@
+# Reconstruye la tabla resumen_diario desde pedidos y gastos
+# Ejecutar desde backend/: python scripts/rebuild_resumen_diario.py [--verify]
+#
+# Sin argumentos borra y recalcula todos los días en una sola transacción
+# (backfill inicial o reparación). Con --verify solo compara la tabla contra
+# el recálculo completo e informa los días con diferencias.
+
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sqlalchemy import text
+from database import engine
+
+# Mismas reglas que rollups.DailyDeltas: lo cancelado no suma ventas ni pedidos
+RECALCULO_SQL = """
+    SELECT fecha,
+           SUM(ventas) AS ventas,
+           SUM(domicilios) AS domicilios,
+           SUM(pedidos) AS pedidos,
+           SUM(cancelado) AS cancelado,
+           SUM(gastos) AS gastos
+    FROM (
+        SELECT fecha_local AS fecha,
+               COALESCE(SUM(total) FILTER (WHERE estado IS DISTINCT FROM 'cancelado'), 0) AS ventas,
+               COALESCE(SUM(valor_domicilio) FILTER (WHERE estado IS DISTINCT FROM 'cancelado'), 0) AS domicilios,
+               COUNT(*) FILTER (WHERE estado IS DISTINCT FROM 'cancelado') AS pedidos,
+               COALESCE(SUM(total) FILTER (WHERE estado = 'cancelado'), 0) AS cancelado,
+               0 AS gastos
+        FROM pedidos
+        WHERE fecha_local IS NOT NULL
+        GROUP BY fecha_local
+        UNION ALL
+        SELECT fecha, 0, 0, 0, 0, SUM(valor)
+        FROM gastos
+        WHERE fecha IS NOT NULL
+        GROUP BY fecha
+    ) movimientos
+    GROUP BY fecha
+"""
+
+def rebuild():
+    with engine.begin() as conn:
+        conn.execute(text("LOCK TABLE resumen_diario IN EXCLUSIVE MODE"))
+        conn.execute(text("DELETE FROM resumen_diario"))
+        result = conn.execute(text(f"""
+            INSERT INTO resumen_diario (fecha, ventas, domicilios, pedidos, cancelado, gastos)
+            {RECALCULO_SQL}
+        """))
+    print(f"[OK] resumen_diario reconstruido: {result.rowcount} día(s)")
+
+def verify():
+    with engine.connect() as conn:
+        diffs = conn.execute(text(f"""
+            WITH esperado AS ({RECALCULO_SQL})
+            SELECT COALESCE(e.fecha, r.fecha) AS fecha,
+                   e.ventas, r.ventas, e.gastos, r.gastos, e.pedidos, r.pedidos
+            FROM esperado e
+            FULL OUTER JOIN resumen_diario r ON r.fecha = e.fecha
+            WHERE COALESCE(e.ventas, 0) <> COALESCE(r.ventas, 0)
+               OR COALESCE(e.domicilios, 0) <> COALESCE(r.domicilios, 0)
+               OR COALESCE(e.pedidos, 0) <> COALESCE(r.pedidos, 0)
+               OR COALESCE(e.cancelado, 0) <> COALESCE(r.cancelado, 0)
+               OR COALESCE(e.gastos, 0) <> COALESCE(r.gastos, 0)
+            ORDER BY 1
+        """)).fetchall()
+
+    if not diffs:
+        print("[OK] resumen_diario coincide con pedidos y gastos")
+        return
+
+    print(f"[ERROR] {len(diffs)} día(s) con diferencias (esperado / tabla):")
+    for fecha, ventas_e, ventas_r, gastos_e, gastos_r, pedidos_e, pedidos_r in diffs:
+        print(f"   {fecha}: ventas {ventas_e} / {ventas_r}, gastos {gastos_e} / {gastos_r}, pedidos {pedidos_e} / {pedidos_r}")
+    print("\nEjecuta sin --verify para reconstruir la tabla.")
+    sys.exit(1)
+
+if __name__ == "__main__":
+    if '--verify' in sys.argv:
+        verify()
+    else:
+        rebuild()
@@ -0,0 +1,71 @@
+# Reconstruye la tabla saldos_medio_pago desde pagos, gastos y transferencias
+# Ejecutar desde backend/: python scripts/rebuild_saldos_medio_pago.py [--verify]
+#
+# Sin argumentos borra y recalcula los saldos en una sola transacción
+# (backfill inicial o reparación). Con --verify solo compara la tabla contra
+# el recálculo completo e informa los medios de pago con diferencias.
+
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sqlalchemy import text
+from database import engine
+
+# Mismas reglas que ledger.BalanceDeltas (y la antigua view_saldos_medios_pago)
+RECALCULO_SQL = """
+    SELECT medio_pago_id,
+           SUM(ingresos) AS ingresos,
+           SUM(egresos) AS egresos
+    FROM (
+        SELECT metodo_pago_id AS medio_pago_id, monto AS ingresos, 0 AS egresos
+        FROM pagos_recibidos WHERE metodo_pago_id IS NOT NULL
+        UNION ALL
+        SELECT medio_pago_id, 0, valor FROM gastos WHERE medio_pago_id IS NOT NULL
+        UNION ALL
+        SELECT destino_id, valor, 0 FROM transferencias WHERE destino_id IS NOT NULL
+        UNION ALL
+        SELECT origen_id, 0, valor FROM transferencias WHERE origen_id IS NOT NULL
+    ) movimientos
+    GROUP BY medio_pago_id
+"""
+
+def rebuild():
+    with engine.begin() as conn:
+        conn.execute(text("LOCK TABLE saldos_medio_pago IN EXCLUSIVE MODE"))
+        conn.execute(text("DELETE FROM saldos_medio_pago"))
+        result = conn.execute(text(f"""
+            INSERT INTO saldos_medio_pago (medio_pago_id, ingresos, egresos)
+            {RECALCULO_SQL}
+        """))
+    print(f"[OK] saldos_medio_pago reconstruido: {result.rowcount} medio(s) de pago")
+
+def verify():
+    with engine.connect() as conn:
+        diffs = conn.execute(text(f"""
+            WITH esperado AS ({RECALCULO_SQL})
+            SELECT COALESCE(e.medio_pago_id, s.medio_pago_id) AS medio_pago_id,
+                   e.ingresos, s.ingresos, e.egresos, s.egresos
+            FROM esperado e
+            FULL OUTER JOIN saldos_medio_pago s ON s.medio_pago_id = e.medio_pago_id
+            WHERE COALESCE(e.ingresos, 0) <> COALESCE(s.ingresos, 0)
+               OR COALESCE(e.egresos, 0) <> COALESCE(s.egresos, 0)
+            ORDER BY 1
+        """)).fetchall()
+
+    if not diffs:
+        print("[OK] saldos_medio_pago coincide con pagos, gastos y transferencias")
+        return
+
+    print(f"[ERROR] {len(diffs)} medio(s) de pago con diferencias (esperado / tabla):")
+    for medio_pago_id, ingresos_e, ingresos_s, egresos_e, egresos_s in diffs:
+        print(f"   #{medio_pago_id}: ingresos {ingresos_e} / {ingresos_s}, egresos {egresos_e} / {egresos_s}")
+    print("\nEjecuta sin --verify para reconstruir la tabla.")
+    sys.exit(1)
+
+if __name__ == "__main__":
+    if '--verify' in sys.argv:
+        verify()
+    else:
+        rebuild()
@@ -0,0 +1,117 @@
+# Verifica que las consultas de los routers usen índices
+# Ejecutar desde backend/: python scripts/verify_indexes.py
+#
+# Cada consulta sale del mismo constructor que usa su router (así no queda
+# desactualizada si el endpoint cambia) y se ejecuta con
+# EXPLAIN (FORMAT JSON) y enable_seqscan desactivado, de modo que el plan
+# muestra si existe un índice utilizable aunque las tablas sean pequeñas.
+# Termina con código 1 si alguna consulta no usa índice.
+
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from database import SessionLocal, engine
+from utils import get_now_colombia, local_date_range
+from routers.orders import orders_page_query
+from routers.receivables import payment_history_query, payment_allocations_query
+from routers.expenses import expenses_query, expenses_page_query, expense_totals_query
+from routers.reports import (
+    dashboard_totals_query, summary_lines_query, client_report_orders_query, vendor_report_expenses_query
+)
+from routers.transfers import transfers_query
+from client_balances import aging_query, client_balances_query
+from allocation import fifo_orders_select
+from sql_models import Pedido
+
+INDEX_NODES = {"Index Scan", "Index Only Scan", "Bitmap Index Scan"}
+
+def router_queries(db):
+    """(nombre, consulta) de las consultas calientes de cada router, armadas
+    con los mismos constructores que usan los endpoints"""
+    today = get_now_colombia().date()
+    month_start = today.replace(day=1)
+    month = local_date_range(month_start, today)
+    cursor = (month[1], 1000)
+
+    return [
+        ("orders: listado paginado",
+         orders_page_query(db).limit(101)),
+        ("orders: siguiente página (keyset)",
+         orders_page_query(db, after=cursor).limit(101)),
+        ("orders: filtro por rango de fechas",
+         orders_page_query(db, month).limit(101)),
+        ("orders: filtro por cliente",
+         orders_page_query(db, cliente_id=1).limit(101)),
+        ("reports: ventas y gastos del mes (resumen_diario)",
+         dashboard_totals_query(db, today)),
+        ("reports: resumen whatsapp",
+         summary_lines_query(db).filter(Pedido.fecha_local == today)),
+        ("reports: reporte de cliente",
+         client_report_orders_query(db, 1, month_start, today)),
+        ("reports: reporte de proveedor",
+         vendor_report_expenses_query(db, 1, month_start, today)),
+        ("receivables: pedidos abiertos del cliente (FIFO)",
+         fifo_orders_select(1, 100000)),
+        ("receivables: cuentas por cobrar (saldo_cliente)",
+         client_balances_query(db)),
+        ("receivables: cuentas por cobrar por antigüedad",
+         aging_query(db, today)),
+        ("receivables: historial de pagos",
+         payment_history_query(db).limit(51)),
+        ("receivables: historial, siguiente página (keyset)",
+         payment_history_query(db, after=cursor).limit(51)),
+        ("receivables: pagos del cliente",
+         payment_history_query(db, cliente_id=1).limit(51)),
+        ("receivables: aplicación de los pagos",
+         payment_allocations_query(db, [1, 2, 3])),
+        ("expenses: listado",
+         expenses_page_query(expenses_query(db)).limit(101)),
+        ("expenses: siguiente página (keyset)",
+         expenses_page_query(expenses_query(db), after=(today, 1000)).limit(101)),
+        ("expenses: rango de fechas",
+         expenses_page_query(expenses_query(db, month_start, today)).limit(101)),
+        ("expenses: totales por categoría del mes",
+         expense_totals_query(expenses_query(db, month_start, today))),
+        ("transfers: listado",
+         transfers_query(db)),
+    ]
+
+def plan_nodes(plan):
+    yield plan
+    for child in plan.get("Plans", []):
+        yield from plan_nodes(child)
+
+def explain(conn, query):
+    # Query del ORM o select() de Core
+    statement = getattr(query, "statement", query)
+    compiled = statement.compile(dialect=engine.dialect, compile_kwargs={"render_postcompile": True})
+    result = conn.exec_driver_sql("EXPLAIN (FORMAT JSON) " + compiled.string, compiled.params).scalar()
+    return result[0]["Plan"]
+
+def verify():
+    db = SessionLocal()
+    failures = 0
+    try:
+        with engine.connect() as conn:
+            conn.exec_driver_sql("SET enable_seqscan = off")
+            for name, query in router_queries(db):
+                nodes = list(plan_nodes(explain(conn, query)))
+                indexes = sorted({n["Index Name"] for n in nodes if n["Node Type"] in INDEX_NODES})
+                if indexes:
+                    print(f"  [OK] {name}: {', '.join(indexes)}")
+                else:
+                    failures += 1
+                    print(f"  [FALLA] {name}: {' -> '.join(n['Node Type'] for n in nodes)}")
+    finally:
+        db.close()
+
+    if failures:
+        print(f"\n[ERROR] {failures} consulta(s) sin índice. ¿Faltan migraciones? python scripts/migrate.py")
+        sys.exit(1)
+    print("\n[OK] Todas las consultas usan índices")
+
+if __name__ == "__main__":
+    print("Verificando uso de índices en las consultas de los routers...\n")
+    verify()
@@ -0,0 +1,63 @@
+# Verifica que la tabla saldo_cliente coincida con los pedidos abiertos
+# Ejecutar desde backend/: python scripts/verify_saldo_cliente.py [--repair]
+#
+# Compara cada fila contra el recálculo completo desde pedidos e informa los
+# clientes con diferencias (drift). Con --repair recalcula esos clientes con
+# la misma función que usa la API.
+
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sqlalchemy import text
+from database import SessionLocal
+from client_balances import refresh_client_balances
+
+# Mismas reglas que client_balances.refresh_client_balances
+DIFERENCIAS_SQL = """
+    WITH esperado AS (
+        SELECT c.id AS cliente_id,
+               COALESCE(SUM(p.total - COALESCE(p.monto_pagado, 0)), 0) AS deuda,
+               COUNT(p.id) AS pedidos_abiertos,
+               MIN(COALESCE(p.fecha, p.created_at)) AS fecha_mas_antigua
+        FROM clientes c
+        LEFT JOIN pedidos p
+               ON p.cliente_id = c.id
+              AND p.estado IN ('pendiente', 'parcial')
+              AND p.total - COALESCE(p.monto_pagado, 0) > 0
+        GROUP BY c.id
+    )
+    SELECT e.cliente_id, e.deuda, s.deuda, e.pedidos_abiertos, s.pedidos_abiertos
+    FROM esperado e
+    LEFT JOIN saldo_cliente s ON s.cliente_id = e.cliente_id
+    WHERE e.deuda <> COALESCE(s.deuda, 0)
+       OR e.pedidos_abiertos <> COALESCE(s.pedidos_abiertos, 0)
+       OR e.fecha_mas_antigua IS DISTINCT FROM s.fecha_mas_antigua
+    ORDER BY e.cliente_id
+"""
+
+def main(repair=False):
+    db = SessionLocal()
+    try:
+        diffs = db.execute(text(DIFERENCIAS_SQL)).fetchall()
+        if not diffs:
+            print("[OK] saldo_cliente coincide con los pedidos abiertos")
+            return
+
+        print(f"[ERROR] {len(diffs)} cliente(s) con diferencias (esperado / tabla):")
+        for cliente_id, deuda_e, deuda_s, abiertos_e, abiertos_s in diffs:
+            print(f"   #{cliente_id}: deuda {deuda_e} / {deuda_s}, pedidos abiertos {abiertos_e} / {abiertos_s}")
+
+        if not repair:
+            print("\nEjecuta con --repair para recalcular esos clientes.")
+            sys.exit(1)
+
+        refresh_client_balances(db, [row[0] for row in diffs])
+        db.commit()
+        print(f"[OK] {len(diffs)} cliente(s) recalculados")
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    main(repair='--repair' in sys.argv)
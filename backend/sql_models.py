@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, Numeric, DateTime, Date, Text
+from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, Numeric, DateTime, Date, Text, Computed, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from database import Base
@@ -80,6 +80,8 @@ class Pedido(Base):
     id = Column(Integer, primary_key=True, index=True)
     cliente_id = Column(Integer, ForeignKey("clientes.id"))
     fecha = Column(DateTime(timezone=True), server_default=func.now())
+    # Colombia business date of fecha, generated by the database and indexed
+    fecha_local = Column(Date, Computed("(fecha AT TIME ZONE 'America/Bogota')::date", persisted=True))
     total = Column(Numeric(12, 2), default=0)
     monto_pagado = Column(Numeric(12, 2), default=0)
     valor_domicilio = Column(Numeric(12, 2), default=0)
@@ -140,6 +142,26 @@ class Gasto(Base):
     pedido_id = Column(Integer, ForeignKey("pedidos.id"))
     observaciones = Column(Text)
     fecha_pago = Column(DateTime(timezone=True))
+    gasto_recurrente_id = Column(Integer, ForeignKey("gastos_recurrentes.id", ondelete="SET NULL"))
+    periodo = Column(Date)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    
+    # One generated expense per template and month (migration 007)
+    __table_args__ = (Index("idx_gastos_recurrente_periodo", "gasto_recurrente_id", "periodo", unique=True),)
+
+class GastoRecurrente(Base):
+    __tablename__ = "gastos_recurrentes"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    concepto = Column(String, nullable=False)
+    categoria = Column(String, nullable=False)
+    tipo_gasto = Column(String, nullable=False, default='fijo')
+    valor = Column(Numeric(12, 2), nullable=False)
+    dia_mes = Column(Integer, nullable=False, default=1)
+    proveedor_id = Column(Integer, ForeignKey("proveedores.id"))
+    medio_pago_id = Column(Integer, ForeignKey("medios_pago.id"))
+    observaciones = Column(Text)
+    activo = Column(Boolean, nullable=False, default=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
 class Transferencia(Base):
@@ -153,3 +175,39 @@ class Transferencia(Base):
     descripcion = Column(Text)
     created_by = Column(Integer, ForeignKey("usuarios.id"))
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+class ResumenDiario(Base):
+    __tablename__ = "resumen_diario"
+    
+    fecha = Column(Date, primary_key=True)
+    ventas = Column(Numeric(14, 2), nullable=False, default=0)
+    domicilios = Column(Numeric(14, 2), nullable=False, default=0)
+    pedidos = Column(Integer, nullable=False, default=0)
+    cancelado = Column(Numeric(14, 2), nullable=False, default=0)
+    gastos = Column(Numeric(14, 2), nullable=False, default=0)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+class SaldoMedioPago(Base):
+    __tablename__ = "saldos_medio_pago"
+    
+    medio_pago_id = Column(Integer, ForeignKey("medios_pago.id", ondelete="CASCADE"), primary_key=True)
+    ingresos = Column(Numeric(14, 2), nullable=False, default=0)
+    egresos = Column(Numeric(14, 2), nullable=False, default=0)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+class CierreMedioPago(Base):
+    __tablename__ = "cierres_medio_pago"
+    
+    fecha = Column(Date, primary_key=True)
+    medio_pago_id = Column(Integer, ForeignKey("medios_pago.id", ondelete="CASCADE"), primary_key=True)
+    ingresos = Column(Numeric(14, 2), nullable=False, default=0)
+    egresos = Column(Numeric(14, 2), nullable=False, default=0)
+
+class SaldoCliente(Base):
+    __tablename__ = "saldo_cliente"
+    
+    cliente_id = Column(Integer, ForeignKey("clientes.id", ondelete="CASCADE"), primary_key=True)
+    deuda = Column(Numeric(14, 2), nullable=False, default=0)
+    pedidos_abiertos = Column(Integer, nullable=False, default=0)
+    fecha_mas_antigua = Column(DateTime(timezone=True))
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
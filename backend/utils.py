@@ -1,4 +1,6 @@
-from datetime import datetime, timezone, timedelta
+import base64
+import json
+from datetime import date, datetime, time, timezone, timedelta
 
 # Define Colombia Timezone (UTC-5)
 COLOMBIA_TZ = timezone(timedelta(hours=-5))
@@ -12,3 +14,37 @@ def to_colombia_time(dt: datetime) -> datetime:
     if dt.tzinfo is None:
         return dt.replace(tzinfo=COLOMBIA_TZ)
     return dt.astimezone(COLOMBIA_TZ)
+
+def parse_local_date(value) -> date:
+    """Parses a YYYY-MM-DD string (or the date part of an ISO datetime); dates pass through"""
+    if isinstance(value, datetime):
+        return to_colombia_time(value).date()
+    if isinstance(value, date):
+        return value
+    return datetime.strptime(value[:10], "%Y-%m-%d").date()
+
+def local_date_range(start, end=None):
+    """Half-open [start, end) timestamptz bounds covering the Colombia local dates start..end.
+
+    Comparing a timestamp column against these bounds (col >= start, col < end)
+    can use a plain index on the column, unlike func.date(col) which also
+    depends on the database session time zone.
+    """
+    start_date = parse_local_date(start)
+    end_date = parse_local_date(end) if end is not None else start_date
+    range_start = datetime.combine(start_date, time.min, tzinfo=COLOMBIA_TZ)
+    range_end = datetime.combine(end_date + timedelta(days=1), time.min, tzinfo=COLOMBIA_TZ)
+    return range_start, range_end
+
+def encode_cursor(fecha, row_id: int) -> str:
+    """Builds an opaque keyset cursor from the (fecha, id) of the last row of a page"""
+    payload = json.dumps([fecha.isoformat(), row_id])
+    return base64.urlsafe_b64encode(payload.encode()).decode()
+
+def decode_cursor(cursor: str):
+    """Returns the (fecha, id) pair stored in a cursor; raises ValueError if malformed"""
+    try:
+        fecha, row_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return datetime.fromisoformat(fecha), int(row_id)
+    except Exception as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
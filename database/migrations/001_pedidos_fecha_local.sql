@@ -0,0 +1,10 @@
+-- 001: Colombia business date for pedidos
+-- fecha is TIMESTAMPTZ; filtering with fecha::date or date(fecha) can't use an index
+-- on fecha and depends on the session time zone. fecha_local is computed once per row
+-- in America/Bogota (UTC-5, no DST) and indexed for daily/monthly report filters.
+
+ALTER TABLE pedidos
+ADD COLUMN IF NOT EXISTS fecha_local DATE
+GENERATED ALWAYS AS ((fecha AT TIME ZONE 'America/Bogota')::date) STORED;
+
+CREATE INDEX IF NOT EXISTS idx_pedidos_fecha_local ON pedidos (fecha_local);
@@ -0,0 +1,32 @@
+-- 002: Secondary indexes for the predicates used by the API routers
+-- Verify with: python scripts/verify_indexes.py (from backend/)
+
+-- PEDIDOS
+-- Orders list: ORDER BY fecha DESC, id DESC with (fecha, id) keyset pagination
+CREATE INDEX IF NOT EXISTS idx_pedidos_fecha_id ON pedidos (fecha, id);
+-- Orders list / client report filtered by client
+CREATE INDEX IF NOT EXISTS idx_pedidos_cliente_fecha ON pedidos (cliente_id, fecha, id);
+-- Open orders per client in FIFO order (payments, receivables, debtors)
+CREATE INDEX IF NOT EXISTS idx_pedidos_abiertos_cliente_fecha ON pedidos (cliente_id, fecha, id)
+WHERE estado IN ('pendiente', 'parcial');
+-- WhatsApp summary: pending orders of a business day
+CREATE INDEX IF NOT EXISTS idx_pedidos_pendientes_fecha_local ON pedidos (fecha_local)
+WHERE estado = 'pendiente';
+
+-- DETALLE PEDIDO
+CREATE INDEX IF NOT EXISTS idx_detalle_pedido_pedido ON detalle_pedido (pedido_id);
+
+-- PAGOS RECIBIDOS
+CREATE INDEX IF NOT EXISTS idx_pagos_recibidos_cliente_fecha ON pagos_recibidos (cliente_id, fecha);
+CREATE INDEX IF NOT EXISTS idx_pagos_recibidos_fecha_id ON pagos_recibidos (fecha, id);
+
+-- PAGOS PEDIDOS (already present in databases migrated from Supabase)
+CREATE INDEX IF NOT EXISTS idx_pagos_pedidos_pago ON pagos_pedidos (pago_id);
+CREATE INDEX IF NOT EXISTS idx_pagos_pedidos_pedido ON pagos_pedidos (pedido_id);
+
+-- GASTOS
+CREATE INDEX IF NOT EXISTS idx_gastos_fecha_id ON gastos (fecha, id);
+CREATE INDEX IF NOT EXISTS idx_gastos_proveedor_fecha ON gastos (proveedor_id, fecha);
+
+-- TRANSFERENCIAS
+CREATE INDEX IF NOT EXISTS idx_transferencias_fecha ON transferencias (fecha);
@@ -0,0 +1,41 @@
+-- 003: Daily sales/expense rollup per Colombia business day
+-- Maintained incrementally by the API on every order and expense write.
+-- Backfilled below; rebuild or verify from raw rows with:
+-- python scripts/rebuild_resumen_diario.py [--verify] (from backend/)
+
+CREATE TABLE IF NOT EXISTS resumen_diario (
+    fecha DATE PRIMARY KEY,
+    ventas DECIMAL(14, 2) NOT NULL DEFAULT 0,     -- total of non-cancelled orders
+    domicilios DECIMAL(14, 2) NOT NULL DEFAULT 0, -- delivery fees of non-cancelled orders
+    pedidos INT NOT NULL DEFAULT 0,               -- number of non-cancelled orders
+    cancelado DECIMAL(14, 2) NOT NULL DEFAULT 0,  -- total of cancelled orders
+    gastos DECIMAL(14, 2) NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
+-- Initial rollup (same query as scripts/rebuild_resumen_diario.py)
+INSERT INTO resumen_diario (fecha, ventas, domicilios, pedidos, cancelado, gastos)
+SELECT fecha,
+       SUM(ventas),
+       SUM(domicilios),
+       SUM(pedidos),
+       SUM(cancelado),
+       SUM(gastos)
+FROM (
+    SELECT fecha_local AS fecha,
+           COALESCE(SUM(total) FILTER (WHERE estado IS DISTINCT FROM 'cancelado'), 0) AS ventas,
+           COALESCE(SUM(valor_domicilio) FILTER (WHERE estado IS DISTINCT FROM 'cancelado'), 0) AS domicilios,
+           COUNT(*) FILTER (WHERE estado IS DISTINCT FROM 'cancelado') AS pedidos,
+           COALESCE(SUM(total) FILTER (WHERE estado = 'cancelado'), 0) AS cancelado,
+           0 AS gastos
+    FROM pedidos
+    WHERE fecha_local IS NOT NULL
+    GROUP BY fecha_local
+    UNION ALL
+    SELECT fecha, 0, 0, 0, 0, SUM(valor)
+    FROM gastos
+    WHERE fecha IS NOT NULL
+    GROUP BY fecha
+) movimientos
+GROUP BY fecha
+ON CONFLICT (fecha) DO NOTHING;
@@ -0,0 +1,28 @@
+-- 004: Running balance per payment method
+-- Replaces reading view_saldos_medios_pago, which re-aggregates every payment,
+-- expense and transfer on each call. The API updates this table in the same
+-- transaction as each payment, expense or transfer write.
+-- Rebuild/verify with: python scripts/rebuild_saldos_medio_pago.py [--verify] (from backend/)
+
+CREATE TABLE IF NOT EXISTS saldos_medio_pago (
+    medio_pago_id INT PRIMARY KEY REFERENCES medios_pago(id) ON DELETE CASCADE,
+    ingresos DECIMAL(14, 2) NOT NULL DEFAULT 0, -- payments received + transfers in
+    egresos DECIMAL(14, 2) NOT NULL DEFAULT 0,  -- expenses + transfers out
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
+-- Initial balances from the full history
+INSERT INTO saldos_medio_pago (medio_pago_id, ingresos, egresos)
+SELECT medio_pago_id, SUM(ingresos), SUM(egresos)
+FROM (
+    SELECT metodo_pago_id AS medio_pago_id, monto AS ingresos, 0 AS egresos
+    FROM pagos_recibidos WHERE metodo_pago_id IS NOT NULL
+    UNION ALL
+    SELECT medio_pago_id, 0, valor FROM gastos WHERE medio_pago_id IS NOT NULL
+    UNION ALL
+    SELECT destino_id, valor, 0 FROM transferencias WHERE destino_id IS NOT NULL
+    UNION ALL
+    SELECT origen_id, 0, valor FROM transferencias WHERE origen_id IS NOT NULL
+) movimientos
+GROUP BY medio_pago_id
+ON CONFLICT (medio_pago_id) DO NOTHING;
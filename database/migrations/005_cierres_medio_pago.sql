@@ -0,0 +1,21 @@
+-- 005: Daily balance checkpoints per payment method
+-- One row per (day, method) with the cumulative ingresos/egresos at the end of
+-- that business day. /transfers/balances?as_of= starts from the nearest
+-- checkpoint and only adds the movements dated after it.
+-- Filled by: python scripts/cierre_medios_pago.py (from backend/, daily)
+-- Backdated payments, expenses and transfers adjust the checkpoints from
+-- their date on in the same transaction as the write.
+
+CREATE TABLE IF NOT EXISTS cierres_medio_pago (
+    fecha DATE NOT NULL,
+    medio_pago_id INT NOT NULL REFERENCES medios_pago(id) ON DELETE CASCADE,
+    ingresos DECIMAL(14, 2) NOT NULL DEFAULT 0,
+    egresos DECIMAL(14, 2) NOT NULL DEFAULT 0,
+    PRIMARY KEY (fecha, medio_pago_id)
+);
+
+-- Per-method movement lookups (movement ledger and as-of deltas)
+CREATE INDEX IF NOT EXISTS idx_pagos_recibidos_metodo_fecha ON pagos_recibidos(metodo_pago_id, fecha);
+CREATE INDEX IF NOT EXISTS idx_gastos_medio_pago_fecha ON gastos(medio_pago_id, fecha);
+CREATE INDEX IF NOT EXISTS idx_transferencias_origen_fecha ON transferencias(origen_id, fecha);
+CREATE INDEX IF NOT EXISTS idx_transferencias_destino_fecha ON transferencias(destino_id, fecha);
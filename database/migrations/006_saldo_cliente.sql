@@ -0,0 +1,29 @@
+-- 006: Outstanding balance per client
+-- Maintained by the API in the same transaction as order and payment writes
+-- (client_balances.refresh_client_balances), so /receivables/accounts and
+-- client-report read one row per client instead of scanning open orders.
+-- Drift check/repair with: python scripts/verify_saldo_cliente.py [--repair] (from backend/)
+
+CREATE TABLE IF NOT EXISTS saldo_cliente (
+    cliente_id INT PRIMARY KEY REFERENCES clientes(id) ON DELETE CASCADE,
+    deuda DECIMAL(14, 2) NOT NULL DEFAULT 0,      -- sum of total - monto_pagado over open orders
+    pedidos_abiertos INT NOT NULL DEFAULT 0,      -- open orders with something left to pay
+    fecha_mas_antigua TIMESTAMP WITH TIME ZONE,   -- date of the oldest of those orders
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_saldo_cliente_deudores ON saldo_cliente(deuda DESC) WHERE deuda > 0;
+
+-- Initial balances
+INSERT INTO saldo_cliente (cliente_id, deuda, pedidos_abiertos, fecha_mas_antigua)
+SELECT c.id,
+       COALESCE(SUM(p.total - COALESCE(p.monto_pagado, 0)), 0),
+       COUNT(p.id),
+       MIN(COALESCE(p.fecha, p.created_at))
+FROM clientes c
+LEFT JOIN pedidos p
+       ON p.cliente_id = c.id
+      AND p.estado IN ('pendiente', 'parcial')
+      AND p.total - COALESCE(p.monto_pagado, 0) > 0
+GROUP BY c.id
+ON CONFLICT (cliente_id) DO NOTHING;
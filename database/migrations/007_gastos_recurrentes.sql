@@ -0,0 +1,24 @@
+-- 007: Recurring expense templates (rent, utilities, payroll)
+-- POST /api/expenses/recurring/generate materializes one gasto per active
+-- template and month with a single batched insert. The unique
+-- (gasto_recurrente_id, periodo) index makes running it twice for the same
+-- month a no-op.
+
+CREATE TABLE IF NOT EXISTS gastos_recurrentes (
+    id SERIAL PRIMARY KEY,
+    concepto TEXT NOT NULL,
+    categoria TEXT NOT NULL,  -- copied to gastos; the API requires it on every expense
+    tipo_gasto TEXT NOT NULL DEFAULT 'fijo' CHECK (tipo_gasto IN ('fijo', 'variable')),
+    valor DECIMAL(12, 2) NOT NULL,
+    dia_mes INT NOT NULL DEFAULT 1 CHECK (dia_mes BETWEEN 1 AND 31),  -- clamped to the last day of shorter months
+    proveedor_id INT REFERENCES proveedores(id),
+    medio_pago_id INT REFERENCES medios_pago(id),
+    observaciones TEXT,
+    activo BOOLEAN NOT NULL DEFAULT TRUE,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
+ALTER TABLE gastos ADD COLUMN IF NOT EXISTS gasto_recurrente_id INT REFERENCES gastos_recurrentes(id) ON DELETE SET NULL;
+ALTER TABLE gastos ADD COLUMN IF NOT EXISTS periodo DATE;  -- first day of the month the template was generated for
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_gastos_recurrente_periodo ON gastos (gasto_recurrente_id, periodo);
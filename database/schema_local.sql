@@ -81,6 +81,7 @@ CREATE TABLE pedidos (
     id SERIAL PRIMARY KEY,
     cliente_id INT REFERENCES clientes(id),
     fecha TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    fecha_local DATE GENERATED ALWAYS AS ((fecha AT TIME ZONE 'America/Bogota')::date) STORED, -- Colombia business date
     total DECIMAL(12, 2) NOT NULL DEFAULT 0,
     monto_pagado DECIMAL(12, 2) DEFAULT 0,
     medio_pago_id INT REFERENCES medios_pago(id), -- For legacy/simple payments
@@ -89,6 +90,8 @@ CREATE TABLE pedidos (
     created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
 );
 
+CREATE INDEX idx_pedidos_fecha_local ON pedidos (fecha_local);
+
 -- 8. DETALLE PEDIDO
 CREATE TABLE detalle_pedido (
     id SERIAL PRIMARY KEY,
@@ -6,6 +6,7 @@ import { useNavigate } from 'react-router-dom';
 export default function Expenses() {
     const navigate = useNavigate();
     const [expenses, setExpenses] = useState([]);
+    const [totalMonth, setTotalMonth] = useState(0);
     const [loading, setLoading] = useState(true);
 
     // Suppliers for editing
@@ -68,13 +69,19 @@ export default function Expenses() {
             const lastDay = new Date(year, m, 0).getDate();
             const endStr = `${month}-${lastDay}`;
 
-            // Allow querying beyond limits?
-            // The service call:
-            const response = await expensesService.getAll({
-                start_date: startStr,
-                end_date: endStr
-            });
-            setExpenses(response.data);
+            // The list is paginated: follow X-Next-Cursor until the month is complete.
+            // The month total comes from the server-side totals of the first page.
+            const params = { start_date: startStr, end_date: endStr, limit: 500, include_totals: true };
+            const response = await expensesService.getAll(params);
+            let rows = response.data.gastos;
+            let cursor = response.headers['x-next-cursor'];
+            while (cursor) {
+                const page = await expensesService.getAll({ start_date: startStr, end_date: endStr, limit: 500, cursor });
+                rows = rows.concat(page.data);
+                cursor = page.headers['x-next-cursor'];
+            }
+            setExpenses(rows);
+            setTotalMonth(response.data.totales_por_categoria.reduce((acc, curr) => acc + curr.total, 0));
         } catch (err) {
             console.error(err);
         } finally {
@@ -187,8 +194,6 @@ export default function Expenses() {
 
     const formatDate = (dateStr) => new Date(dateStr).toLocaleDateString('es-CO', { day: '2-digit', month: '2-digit', year: 'numeric' });
 
-    const totalMonth = expenses.reduce((acc, curr) => acc + curr.valor, 0);
-
     return (
         <div>
             <div className="page-header flex justify-between items-center mb-6">